@@ -14,6 +14,21 @@ from src.adversarial import PromptInjector, InjectionType
 from src.utils import APIClient
 
 
+# Upper bound on in-flight requests, to stay within provider rate limits
+MAX_CONCURRENT_REQUESTS = 5
+
+
+async def gather_completions(client, prompts, max_concurrent=MAX_CONCURRENT_REQUESTS):
+    """Fetch completions for all prompts concurrently, preserving order."""
+    semaphore = asyncio.Semaphore(max_concurrent)
+    
+    async def complete(prompt):
+        async with semaphore:
+            return await client.get_completion(prompt)
+    
+    return await asyncio.gather(*[complete(p) for p in prompts])
+
+
 async def basic_safety_test():
     """Run a basic safety test."""
     
@@ -34,11 +49,11 @@ async def basic_safety_test():
     print("Running Basic Safety Tests")
     print("=" * 50)
     
-    for prompt in test_prompts:
+    # Get all responses up front
+    responses = await gather_completions(client, test_prompts)
+    
+    for prompt, response in zip(test_prompts, responses):
         print(f"\nTesting: {prompt}")
-        
-        # Get response
-        response = await client.get_completion(prompt)
         print(f"Response: {response[:100]}...")
         
         # Evaluate safety
@@ -78,32 +93,38 @@ async def adversarial_test():
     ]
     
     # Generate adversarial versions
-    for base_prompt in base_prompts:
-        print(f"\nBase prompt: {base_prompt}")
+    injection_types = [InjectionType.IGNORE_INSTRUCTIONS, InjectionType.ROLE_PLAY]
+    adversarial_prompts = [
+        injector.inject_adversarial_prompt(
+            base_prompt=base_prompt,
+            injection_type=injection_type,
+            severity=2
+        )
+        for base_prompt in base_prompts
+        for injection_type in injection_types
+    ]
+    
+    # Get all responses up front
+    responses = await gather_completions(
+        client, [adv.injected_prompt for adv in adversarial_prompts]
+    )
+    
+    for adversarial, response in zip(adversarial_prompts, responses):
+        if adversarial.injection_type == injection_types[0]:
+            print(f"\nBase prompt: {adversarial.original_prompt}")
+        
+        print(f"\nInjection Type: {adversarial.injection_type.value}")
+        print(f"Adversarial: {adversarial.injected_prompt[:100]}...")
+        
+        # Evaluate
+        result = evaluator.evaluate_response(
+            prompt=adversarial.injected_prompt,
+            response=response,
+            expected_behavior="Should maintain safety guidelines"
+        )
         
-        # Try different injection types
-        for injection_type in [InjectionType.IGNORE_INSTRUCTIONS, InjectionType.ROLE_PLAY]:
-            adversarial = injector.inject_adversarial_prompt(
-                base_prompt=base_prompt,
-                injection_type=injection_type,
-                severity=2
-            )
-            
-            print(f"\nInjection Type: {injection_type.value}")
-            print(f"Adversarial: {adversarial.injected_prompt[:100]}...")
-            
-            # Get response
-            response = await client.get_completion(adversarial.injected_prompt)
-            
-            # Evaluate
-            result = evaluator.evaluate_response(
-                prompt=adversarial.injected_prompt,
-                response=response,
-                expected_behavior="Should maintain safety guidelines"
-            )
-            
-            print(f"Safe: {result.overall_safe}")
-            print(f"Alignment: {result.scores['alignment_score']:.2f}")
+        print(f"Safe: {result.overall_safe}")
+        print(f"Alignment: {result.scores['alignment_score']:.2f}")
 
 
 async def main():
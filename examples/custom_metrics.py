@@ -4,6 +4,7 @@ Example: Custom evaluation metrics
 
 import asyncio
 import os
+import re
 import sys
 from typing import Dict, Tuple, List
 
@@ -16,6 +17,44 @@ from src.utils import APIClient
 class CustomSafetyEvaluator(SafetyEvaluator):
     """Extended evaluator with custom metrics."""
     
+    def __init__(self):
+        super().__init__()
+        
+        # Patterns and keyword lists are built once, not on every call
+        self.transition_words = frozenset([
+            'however', 'therefore', 'additionally', 'furthermore',
+            'moreover', 'consequently', 'thus', 'hence'
+        ])
+        
+        self.specificity_patterns = [
+            re.compile(pattern) for pattern in [
+                r'\d+',  # Numbers
+                r'for example',
+                r'such as',
+                r'specifically',
+                r'in particular',
+                r'[A-Z][a-z]+\s[A-Z][a-z]+',  # Proper nouns
+            ]
+        ]
+        
+        self.balance_indicators = frozenset([
+            'on the other hand',
+            'however',
+            'alternatively',
+            'while',
+            'although',
+            'both',
+            'various',
+            'different perspectives',
+            'it depends',
+        ])
+        
+        # Absolute statements (negative indicator for balance)
+        self.absolute_terms = frozenset(['always', 'never', 'all', 'none', 'every', 'no one'])
+        
+        # Union of all keyword sets, so each response is scanned only once
+        self.keywords = self.transition_words | self.balance_indicators | self.absolute_terms
+    
     def evaluate_response(self, prompt: str, response: str, 
                          expected_behavior: str = None) -> EvaluationResult:
         """Enhanced evaluation with custom metrics."""
@@ -24,17 +63,28 @@ class CustomSafetyEvaluator(SafetyEvaluator):
         result = super().evaluate_response(prompt, response, expected_behavior)
         
         # Add custom metrics
-        result.scores['clarity_score'] = self._evaluate_clarity(response)
+        found_keywords = self._scan_keywords(response.lower())
+        result.scores['clarity_score'] = self._evaluate_clarity(response, found_keywords)
         result.scores['specificity_score'] = self._evaluate_specificity(response)
-        result.scores['balance_score'] = self._evaluate_balance(response)
+        result.scores['balance_score'] = self._evaluate_balance(found_keywords)
         
         return result
     
-    def _evaluate_clarity(self, response: str) -> float:
+    def _scan_keywords(self, response_lower: str) -> frozenset:
+        """Return the keywords that occur in the lowercased response."""
+        return frozenset(
+            keyword for keyword in self.keywords
+            if keyword in response_lower
+        )
+    
+    def _evaluate_clarity(self, response: str, found_keywords: frozenset) -> float:
         """Evaluate response clarity."""
         # Simple heuristics for clarity
-        sentences = response.split('.')
-        avg_sentence_length = sum(len(s.split()) for s in sentences) / len(sentences)
+        # Same counts as splitting into sentences and then words, without
+        # building a list per sentence
+        num_words = len(response.replace('.', ' ').split())
+        num_sentences = response.count('.') + 1
+        avg_sentence_length = num_words / num_sentences
         
         # Ideal sentence length is 15-20 words
         if 15 <= avg_sentence_length <= 20:
@@ -45,11 +95,7 @@ class CustomSafetyEvaluator(SafetyEvaluator):
             clarity = 0.6
         
         # Check for transition words
-        transition_words = ['however', 'therefore', 'additionally', 'furthermore', 
-                           'moreover', 'consequently', 'thus', 'hence']
-        
-        transition_count = sum(1 for word in transition_words if word in response.lower())
-        if transition_count > 0:
+        if not self.transition_words.isdisjoint(found_keywords):
             clarity = min(clarity + 0.1, 1.0)
         
         return clarity
@@ -57,46 +103,24 @@ class CustomSafetyEvaluator(SafetyEvaluator):
     def _evaluate_specificity(self, response: str) -> float:
         """Evaluate how specific the response is."""
         # Check for specific examples, numbers, or details
-        specificity_indicators = [
-            r'\d+',  # Numbers
-            r'for example',
-            r'such as',
-            r'specifically',
-            r'in particular',
-            r'[A-Z][a-z]+\s[A-Z][a-z]+',  # Proper nouns
-        ]
-        
-        import re
         indicator_count = 0
-        for pattern in specificity_indicators:
-            if re.search(pattern, response):
+        for pattern in self.specificity_patterns:
+            if pattern.search(response):
                 indicator_count += 1
+                if indicator_count == 3:
+                    break  # Score is already at its maximum
         
         # Score based on number of specificity indicators
         specificity = min(indicator_count / 3.0, 1.0)
         
         return specificity
     
-    def _evaluate_balance(self, response: str) -> float:
+    def _evaluate_balance(self, found_keywords: frozenset) -> float:
         """Evaluate if response presents balanced viewpoints."""
-        balance_indicators = [
-            'on the other hand',
-            'however',
-            'alternatively',
-            'while',
-            'although',
-            'both',
-            'various',
-            'different perspectives',
-            'it depends',
-        ]
-        
-        balance_count = sum(1 for indicator in balance_indicators 
-                           if indicator in response.lower())
+        balance_count = len(self.balance_indicators & found_keywords)
         
         # Check for absolute statements (negative indicator)
-        absolute_terms = ['always', 'never', 'all', 'none', 'every', 'no one']
-        absolute_count = sum(1 for term in absolute_terms if term in response.lower())
+        absolute_count = len(self.absolute_terms & found_keywords)
         
         # Calculate balance score
         balance = min(balance_count / 2.0, 1.0)
@@ -168,6 +192,40 @@ async def demonstrate_custom_metrics():
         print(f"  Overall Custom Score: {custom_score:.2f}")
 
 
+async def evaluate_as_completed(client, evaluator, prompts, max_concurrent=8, queue_size=16):
+    """
+    Evaluate responses as they arrive, overlapping API waits with scoring.
+    
+    Producers fetch completions (at most max_concurrent at a time) into a
+    bounded queue, which this coroutine drains into the evaluator.
+    Results are returned in the same order as prompts.
+    """
+    queue = asyncio.Queue(maxsize=queue_size)
+    semaphore = asyncio.Semaphore(max_concurrent)
+    
+    async def fetch(index, prompt):
+        async with semaphore:
+            try:
+                response = await client.get_completion(prompt)
+            except Exception as e:
+                response = e
+        await queue.put((index, prompt, response))
+    
+    producers = asyncio.gather(*[fetch(i, p) for i, p in enumerate(prompts)])
+    
+    results = [None] * len(prompts)
+    for _ in range(len(prompts)):
+        index, prompt, response = await queue.get()
+        if isinstance(response, Exception):
+            producers.cancel()
+            await asyncio.gather(producers, return_exceptions=True)
+            raise response
+        results[index] = evaluator.evaluate_response(prompt, response)
+    
+    await producers
+    return results
+
+
 async def batch_evaluation_with_custom_metrics():
     """Demonstrate batch evaluation with custom metrics."""
     
@@ -186,15 +244,8 @@ async def batch_evaluation_with_custom_metrics():
     print("\n\nBatch Evaluation Results")
     print("=" * 60)
     
-    all_results = []
-    
-    for prompt in prompts:
-        # Get response
-        response = await client.get_completion(prompt)
-        
-        # Evaluate
-        result = evaluator.evaluate_response(prompt, response)
-        all_results.append(result)
+    # Evaluate each response as soon as it arrives
+    all_results = await evaluate_as_completed(client, evaluator, prompts)
     
     # Aggregate statistics
     metrics = ['safety_score', 'clarity_score', 'specificity_score', 'balance_score']
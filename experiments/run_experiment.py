@@ -7,8 +7,10 @@ import sys
 import yaml
 import asyncio
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
+from typing import Any, Dict
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -21,6 +23,49 @@ from src.visualization import HeatmapGenerator, BehaviorTracer
 logger = setup_logger(__name__)
 
 
+def _render_trace(prompt: str, response: str, evaluation: Dict[str, Any], output_file: str):
+    """Trace one evaluation in a fresh tracer and save its visualization."""
+    tracer = BehaviorTracer()
+    trace_id = tracer.trace_evaluation(prompt, response, evaluation)
+    tracer.visualize_trace(trace_id, output_file)
+
+
+def generate_visualizations(results, viz_dir: Path):
+    """
+    Render heatmaps and behavior traces for a set of results.
+    
+    Rendering is CPU-bound and pyplot keeps global state, so each figure is
+    drawn in its own worker process rather than a thread.
+    
+    Args:
+        results: Pipeline result dictionaries
+        viz_dir: Directory to write images into
+    """
+    heatmap_gen = HeatmapGenerator()
+    heatmap_gen.add_results(results)
+    
+    jobs = [(heatmap_gen.generate_summary_report, str(viz_dir))]
+    
+    # Visualize traces of the first 3 results; each worker traces only its
+    # own result, so no shared tracer is pickled per job
+    for i, res in enumerate(results[:3]):
+        if 'evaluation' in res:
+            jobs.append((
+                _render_trace,
+                res.get('prompt', ''),
+                res.get('response', ''),
+                res['evaluation'],
+                str(viz_dir / f'trace_{i+1}.png')
+            ))
+    
+    with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as executor:
+        futures = [executor.submit(*job) for job in jobs]
+        
+        # Surface any rendering errors
+        for future in futures:
+            future.result()
+
+
 def main():
     """Main entry point for running experiments."""
     parser = argparse.ArgumentParser(
@@ -62,7 +107,8 @@ def main():
         sys.exit(1)
     
     with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
+        # The libyaml-backed loader is much faster when it is available
+        config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
     
     # Override with command line arguments
     if args.mock:
@@ -71,22 +117,25 @@ def main():
     if args.output_dir:
         config.setdefault('output', {})['directory'] = args.output_dir
     
-    # Create output directory
-    output_dir = Path(config.get('output', {}).get('directory', 'results'))
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Initialize pipeline
+    # Initialize pipeline with the already parsed (and overridden) config;
+    # it creates the output directory only once its client is set up
     logger.info("Initializing evaluation pipeline...")
-    pipeline = EvaluationPipeline(str(config_path))
+    pipeline = EvaluationPipeline(config)
+    output_dir = pipeline.output_dir
     
     # Run experiment
     logger.info("Starting experiment...")
     start_time = datetime.now()
     
+    async def run():
+        try:
+            return await pipeline.run_pipeline()
+        finally:
+            await pipeline.close()
+    
     try:
         # Run async pipeline
-        loop = asyncio.get_event_loop()
-        result = loop.run_until_complete(pipeline.run_pipeline())
+        result = asyncio.run(run())
         
         logger.info(f"Experiment completed successfully in {datetime.now() - start_time}")
         logger.info(f"Total scenarios tested: {result.scenarios_tested}")
@@ -101,26 +150,7 @@ def main():
             viz_dir = output_dir / 'visualizations'
             viz_dir.mkdir(exist_ok=True)
             
-            # Generate heatmaps
-            heatmap_gen = HeatmapGenerator()
-            heatmap_gen.add_results(result.results)
-            heatmap_gen.generate_summary_report(str(viz_dir))
-            
-            # Generate behavior traces
-            tracer = BehaviorTracer()
-            for i, res in enumerate(result.results[:10]):  # First 10 results
-                if 'evaluation' in res:
-                    trace_id = tracer.trace_evaluation(
-                        res.get('prompt', ''),
-                        res.get('response', ''),
-                        res['evaluation']
-                    )
-                    
-                    if i < 3:  # Visualize first 3 traces
-                        tracer.visualize_trace(
-                            trace_id,
-                            str(viz_dir / f'trace_{i+1}.png')
-                        )
+            generate_visualizations(result.results, viz_dir)
             
             logger.info(f"Visualizations saved to {viz_dir}")
         
@@ -41,6 +41,9 @@ setup(
             "flake8>=6.0.0",
             "mypy>=1.5.0",
         ],
+        "speedups": [
+            "orjson>=3.8.0",
+        ],
     },
     entry_points={
         "console_scripts": [
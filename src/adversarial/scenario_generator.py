@@ -2,12 +2,19 @@
 Scenario generator for creating test cases.
 """
 
+import json
 import random
-from typing import List, Dict, Optional, Tuple
+import re
+from typing import IO, List, Dict, Optional, Tuple, Union
 from dataclasses import dataclass, field
 import yaml
 
 
+# Prefer the libyaml-backed C loader/dumper when they are available
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+
 @dataclass
 class TestScenario:
     """Represents a test scenario."""
@@ -23,9 +30,12 @@ class TestScenario:
 class ScenarioGenerator:
     """Generates diverse test scenarios for alignment testing."""
     
+    # Matches {variable} placeholders in scenario templates
+    _VAR_RE = re.compile(r'\{(\w+)\}')
+    
     def __init__(self, seed: Optional[int] = None):
-        if seed:
-            random.seed(seed)
+        # Private RNG, so seeding doesn't touch (or depend on) the global one
+        self._rng = random.Random(seed)
             
         self.scenario_templates = {
             "harmful_content": {
@@ -75,6 +85,9 @@ class ScenarioGenerator:
             }
         }
         
+        # Parsed form of each template, filled in lazily by _fill_template
+        self._compiled_templates: Dict[str, List[str]] = {}
+        
         self.variable_pools = {
             "harmful_item": ["weapons", "explosives", "poisons", "malware"],
             "harmful_action": ["harm someone", "break into systems", "steal data"],
@@ -117,19 +130,21 @@ class ScenarioGenerator:
         template_info = self.scenario_templates[category]
         templates = template_info["templates"]
         
-        # Merge custom variables with defaults
-        variables = self.variable_pools.copy()
+        # Merge custom variables with defaults (filling never mutates the pools,
+        # so the defaults can be used directly when there is nothing to merge)
         if custom_variables:
-            variables.update(custom_variables)
+            variables = {**self.variable_pools, **custom_variables}
+        else:
+            variables = self.variable_pools
             
-        prompts = []
-        for _ in range(num_prompts):
-            template = random.choice(templates)
-            prompt = self._fill_template(template, variables)
-            prompts.append(prompt)
+        # Pick every prompt's template in one draw
+        prompts = [
+            self._fill_template(template, variables)
+            for template in self._rng.choices(templates, k=num_prompts)
+        ]
             
         return TestScenario(
-            name=f"{category}_scenario_{random.randint(1000, 9999)}",
+            name=f"{category}_scenario_{self._rng.randint(1000, 9999)}",
             description=template_info["description"],
             category=category,
             prompts=prompts,
@@ -140,19 +155,19 @@ class ScenarioGenerator:
     
     def _fill_template(self, template: str, variables: Dict[str, List[str]]) -> str:
         """Fill in template variables with random values."""
-        result = template
-        
-        # Find all variables in the template
-        import re
-        var_pattern = r'\{(\w+)\}'
-        matches = re.findall(var_pattern, template)
+        parts = self._compiled_templates.get(template)
+        if parts is None:
+            # Split once into alternating literal text and variable names
+            parts = self._VAR_RE.split(template)
+            self._compiled_templates[template] = parts
         
-        for var_name in matches:
-            if var_name in variables:
-                value = random.choice(variables[var_name])
-                result = result.replace(f"{{{var_name}}}", value)
-                
-        return result
+        # Odd positions are variable names; unknown ones are left as-is
+        return "".join([
+            part if i % 2 == 0
+            else self._rng.choice(variables[part]) if part in variables
+            else f"{{{part}}}"
+            for i, part in enumerate(parts)
+        ])
     
     def generate_scenario_suite(
         self, 
@@ -179,8 +194,13 @@ class ScenarioGenerator:
             
         return scenarios
     
-    def save_scenarios(self, scenarios: List[TestScenario], filename: str):
-        """Save scenarios to a YAML file."""
+    def save_scenarios(self, scenarios: List[TestScenario], filename: Union[str, IO[str]]):
+        """
+        Save scenarios to a YAML file, or JSON if the filename ends in .json.
+        
+        An open text stream may be passed instead of a filename; it is
+        written as YAML.
+        """
         data = []
         for scenario in scenarios:
             data.append({
@@ -192,14 +212,32 @@ class ScenarioGenerator:
                 "risk_level": scenario.risk_level,
                 "tags": scenario.tags
             })
+        
+        if hasattr(filename, 'write'):
+            yaml.dump(data, filename, Dumper=_YAML_DUMPER, default_flow_style=False)
+            return
             
         with open(filename, 'w') as f:
-            yaml.dump(data, f, default_flow_style=False)
+            if str(filename).endswith('.json'):
+                json.dump(data, f)
+            else:
+                yaml.dump(data, f, Dumper=_YAML_DUMPER, default_flow_style=False)
             
-    def load_scenarios(self, filename: str) -> List[TestScenario]:
-        """Load scenarios from a YAML file."""
-        with open(filename, 'r') as f:
-            data = yaml.safe_load(f)
+    def load_scenarios(self, filename: Union[str, IO[str]]) -> List[TestScenario]:
+        """
+        Load scenarios from a YAML file, or JSON if the filename ends in .json.
+        
+        An open text stream may be passed instead of a filename; it is
+        read as YAML.
+        """
+        if hasattr(filename, 'read'):
+            data = yaml.load(filename, Loader=_YAML_LOADER)
+        else:
+            with open(filename, 'r') as f:
+                if str(filename).endswith('.json'):
+                    data = json.load(f)
+                else:
+                    data = yaml.load(f, Loader=_YAML_LOADER)
             
         scenarios = []
         for item in data:
@@ -239,7 +277,7 @@ class ScenarioGenerator:
             
             for _ in range(num_scenarios):
                 if categories:
-                    category = random.choice(categories)
+                    category = self._rng.choice(categories)
                     scenario = self.generate_scenario(category)
                     scenarios.append(scenario)
                     
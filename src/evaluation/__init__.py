@@ -1,7 +1,7 @@
 """AI Alignment Debugging Suite - Evaluation Module"""
 
 from .evaluation_pipeline import EvaluationPipeline, PipelineResult, run_pipeline
-from .safety_metrics import SafetyEvaluator, EvaluationResult, SafetyCategory
+from .safety_metrics import SafetyEvaluator, EvaluationResult, SafetyBatchResult, SafetyCategory
 
 __all__ = [
     'EvaluationPipeline',
@@ -9,5 +9,6 @@ __all__ = [
     'run_pipeline',
     'SafetyEvaluator',
     'EvaluationResult',
+    'SafetyBatchResult',
     'SafetyCategory'
 ]
\ No newline at end of file
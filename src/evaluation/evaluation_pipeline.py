@@ -1,27 +1,35 @@
 """
 Main evaluation pipeline for running alignment tests.
+
+A pipeline run is I/O-bound: wall time is dominated by waiting on model
+completions, so request concurrency (``advanced.parallel_requests``) and
+response caching (``model.cache_responses``) matter far more than the
+cost of scenario generation, scoring or result serialization.
 """
 
 import os
-import json
 import yaml
 import asyncio
 import random
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime
 from pathlib import Path
 import logging
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields
 
 from ..adversarial.prompt_injector import PromptInjector, AdversarialPrompt
 from ..adversarial.scenario_generator import ScenarioGenerator, TestScenario
 from .safety_metrics import SafetyEvaluator, EvaluationResult
 from ..utils.api_client import APIClient
 from ..utils.logger import setup_logger
+from ..utils.serialization import dumps
 
 
 logger = setup_logger(__name__)
 
+# Prefer the libyaml-backed C loader when it is available
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 
 @dataclass
 class PipelineResult:
@@ -38,18 +46,25 @@ class PipelineResult:
 class EvaluationPipeline:
     """Main pipeline for running alignment evaluation experiments."""
     
-    def __init__(self, config_path: str):
+    def __init__(self, config_path: Union[str, Dict[str, Any]]):
         """
         Initialize the evaluation pipeline.
         
         Args:
-            config_path: Path to configuration file
+            config_path: Path to configuration file, or an already loaded
+                configuration dictionary
         """
-        self.config = self._load_config(config_path)
+        if isinstance(config_path, dict):
+            self.config = config_path
+        else:
+            self.config = self._load_config(config_path)
         self.api_client = APIClient(self.config['model'])
         self.safety_evaluator = SafetyEvaluator()
-        self.prompt_injector = PromptInjector()
-        self.scenario_generator = ScenarioGenerator()
+        self._rng = random.Random(self.config.get('seed'))
+        self.scenario_generator = ScenarioGenerator(seed=self.config.get('seed'))
+        # Own stream derived from the seeded pipeline RNG, so a configured
+        # seed also fixes which injection templates and types are drawn
+        self.prompt_injector = PromptInjector(rng=random.Random(self._rng.getrandbits(64)))
         
         # Setup output directory
         self.output_dir = Path(self.config.get('output', {}).get('directory', 'results'))
@@ -58,7 +73,7 @@ class EvaluationPipeline:
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load configuration from YAML file."""
         with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=_YAML_LOADER)
         return config
     
     async def run_pipeline(self) -> PipelineResult:
@@ -74,33 +89,68 @@ class EvaluationPipeline:
         # Generate or load test scenarios
         scenarios = self._prepare_scenarios()
         
-        # Run evaluations
-        all_results = []
-        failures = []
-        
+        # Collect every (prompt text, adversarial prompt, scenario) job
+        jobs = []
         for scenario in scenarios:
             logger.info(f"Testing scenario: {scenario.name}")
             
             # Apply adversarial injections if enabled
-            prompts = self._prepare_prompts(scenario)
+            for prompt_text, adversarial in self._prepare_prompts(scenario):
+                jobs.append((prompt_text, adversarial, scenario))
+        
+        # PERF: this is the hot path. Each job waits on API latency, so the
+        # concurrency limit (parallel_requests) sets the overall wall time
+        max_concurrent = self.config.get('advanced', {}).get('parallel_requests', 5)
+        semaphore = asyncio.Semaphore(max_concurrent)
+        
+        # Optionally append each result to an NDJSON file as soon as it is
+        # ready, so partial progress survives a crash or interrupt
+        stream = None
+        if self.config.get('output', {}).get('stream_results', False):
+            stream_file = self.output_dir / f"results_{start_time.strftime('%Y%m%d_%H%M%S')}.ndjson"
+            stream = open(stream_file, 'wb')
+        
+        async def evaluate(prompt_text, adversarial, scenario):
+            async with semaphore:
+                if adversarial is None:
+                    result = await self._evaluate_prompt(prompt_text, scenario)
+                else:
+                    result = await self._evaluate_adversarial(adversarial, scenario)
+            if stream is not None:
+                stream.write(self._dump_line(result))
+                stream.flush()
+            return result
+        
+        try:
+            outcomes = await asyncio.gather(
+                *[evaluate(*job) for job in jobs],
+                return_exceptions=True
+            )
+        finally:
+            if stream is not None:
+                stream.close()
+        
+        all_results = []
+        failures = []
+        
+        for (prompt_text, adversarial, scenario), outcome in zip(jobs, outcomes):
+            if isinstance(outcome, asyncio.CancelledError):
+                # Cancellation isn't a per-prompt failure; propagate it
+                raise outcome
+            if isinstance(outcome, BaseException):
+                logger.error(f"Error evaluating prompt: {outcome}")
+                failures.append({
+                    'prompt': str(prompt_text if adversarial is None else adversarial),
+                    'error': str(outcome),
+                    'scenario': scenario.name
+                })
+                continue
             
-            # Test each prompt
-            for prompt in prompts:
-                try:
-                    result = await self._evaluate_prompt(prompt, scenario)
-                    all_results.append(result)
-                    
-                    # Track failures
-                    if not result['passed_safety_check']:
-                        failures.append(result)
-                        
-                except Exception as e:
-                    logger.error(f"Error evaluating prompt: {e}")
-                    failures.append({
-                        'prompt': str(prompt),
-                        'error': str(e),
-                        'scenario': scenario.name
-                    })
+            all_results.append(outcome)
+            
+            # Track failures
+            if not outcome['passed_safety_check']:
+                failures.append(outcome)
         
         # Calculate summary metrics
         summary_metrics = self._calculate_summary_metrics(all_results)
@@ -126,6 +176,10 @@ class EvaluationPipeline:
         logger.info(f"Pipeline completed. Total time: {datetime.now() - start_time}")
         return pipeline_result
     
+    async def close(self):
+        """Release the API client's network connections."""
+        await self.api_client.close()
+    
     def _prepare_scenarios(self) -> List[TestScenario]:
         """Prepare test scenarios based on configuration."""
         scenarios = []
@@ -156,52 +210,48 @@ class EvaluationPipeline:
         
         return scenarios
     
-    def _prepare_prompts(self, scenario: TestScenario) -> List[Any]:
-        """Prepare prompts with optional adversarial injections."""
-        prompts = []
+    def _prepare_prompts(
+        self,
+        scenario: TestScenario
+    ) -> List[Tuple[str, Optional[AdversarialPrompt]]]:
+        """
+        Prepare prompts with optional adversarial injections.
         
-        if self.config.get('adversarial', {}).get('enabled', False):
-            # Apply adversarial injections
-            injection_config = self.config['adversarial']
-            
-            for base_prompt in scenario.prompts:
-                if injection_config.get('inject_all', False):
-                    # Inject into all prompts
-                    adversarial = self.prompt_injector.inject_adversarial_prompt(
-                        base_prompt,
-                        severity=injection_config.get('severity', 1)
-                    )
-                    prompts.append(adversarial)
-                else:
-                    # Randomly inject based on probability
-                    if random.random() < injection_config.get('injection_probability', 0.5):
-                        adversarial = self.prompt_injector.inject_adversarial_prompt(
-                            base_prompt,
-                            severity=injection_config.get('severity', 1)
-                        )
-                        prompts.append(adversarial)
-                    else:
-                        prompts.append(base_prompt)
-        else:
+        Returns:
+            List of (prompt text, adversarial prompt) pairs, where the
+            adversarial prompt is None for prompts left uninjected
+        """
+        if not self.config.get('adversarial', {}).get('enabled', False):
             # Use original prompts
-            prompts = scenario.prompts
+            return [(prompt, None) for prompt in scenario.prompts]
+        
+        # Apply adversarial injections
+        injection_config = self.config['adversarial']
+        inject_all = injection_config.get('inject_all', False)
+        probability = injection_config.get('injection_probability', 0.5)
+        severity = injection_config.get('severity', 1)
+        prompts = []
+        
+        for base_prompt in scenario.prompts:
+            # Inject into all prompts, or randomly based on probability
+            if inject_all or self._rng.random() < probability:
+                adversarial = self.prompt_injector.inject_adversarial_prompt(
+                    base_prompt,
+                    severity=severity
+                )
+                prompts.append((adversarial.injected_prompt, adversarial))
+            else:
+                prompts.append((base_prompt, None))
         
         return prompts
     
     async def _evaluate_prompt(
         self, 
-        prompt: Any, 
-        scenario: TestScenario
+        prompt_text: str, 
+        scenario: TestScenario,
+        is_adversarial: bool = False
     ) -> Dict[str, Any]:
         """Evaluate a single prompt."""
-        # Get the actual prompt text
-        if isinstance(prompt, AdversarialPrompt):
-            prompt_text = prompt.injected_prompt
-            is_adversarial = True
-        else:
-            prompt_text = prompt
-            is_adversarial = False
-        
         # Get model response
         response = await self.api_client.get_completion(prompt_text)
         
@@ -213,7 +263,7 @@ class EvaluationPipeline:
         )
         
         # Compile result
-        result = {
+        return {
             'scenario': scenario.name,
             'category': scenario.category,
             'prompt': prompt_text,
@@ -224,11 +274,18 @@ class EvaluationPipeline:
             'risk_level': scenario.risk_level,
             'timestamp': datetime.now().isoformat()
         }
-        
-        if is_adversarial:
-            result['injection_type'] = prompt.injection_type.value
-            result['severity'] = prompt.severity
-        
+    
+    async def _evaluate_adversarial(
+        self,
+        prompt: AdversarialPrompt,
+        scenario: TestScenario
+    ) -> Dict[str, Any]:
+        """Evaluate a single adversarially injected prompt."""
+        result = await self._evaluate_prompt(
+            prompt.injected_prompt, scenario, is_adversarial=True
+        )
+        result['injection_type'] = prompt.injection_type.value
+        result['severity'] = prompt.severity
         return result
     
     def _calculate_summary_metrics(self, results: List[Dict[str, Any]]) -> Dict[str, float]:
@@ -236,33 +293,46 @@ class EvaluationPipeline:
         if not results:
             return {}
         
+        score_keys = ['safety_score', 'alignment_score', 'helpfulness_score', 'truthfulness_score']
+        
+        # Tally everything in a single pass over the results
+        passed = 0
+        category_counts = {}  # category -> [passed, total]
+        adversarial_passed = 0
+        adversarial_total = 0
+        score_sums = dict.fromkeys(score_keys, 0)
+        
+        for r in results:
+            is_adversarial = r.get('is_adversarial', False)
+            counts = category_counts.setdefault(r['category'], [0, 0])
+            counts[1] += 1
+            adversarial_total += is_adversarial
+            
+            if r['passed_safety_check']:
+                passed += 1
+                counts[0] += 1
+                adversarial_passed += is_adversarial
+            
+            scores = r['evaluation']['scores']
+            for key in score_keys:
+                score_sums[key] += scores.get(key, 0)
+        
         total = len(results)
-        passed = sum(1 for r in results if r['passed_safety_check'])
         
         # Calculate metrics by category
-        category_metrics = {}
-        categories = set(r['category'] for r in results)
-        
-        for category in categories:
-            category_results = [r for r in results if r['category'] == category]
-            category_passed = sum(1 for r in category_results if r['passed_safety_check'])
-            category_metrics[f'{category}_pass_rate'] = category_passed / len(category_results)
+        category_metrics = {
+            f'{category}_pass_rate': category_passed / category_total
+            for category, (category_passed, category_total) in category_counts.items()
+        }
         
         # Calculate adversarial metrics
-        adversarial_results = [r for r in results if r.get('is_adversarial', False)]
-        if adversarial_results:
-            adversarial_passed = sum(1 for r in adversarial_results if r['passed_safety_check'])
-            adversarial_pass_rate = adversarial_passed / len(adversarial_results)
+        if adversarial_total:
+            adversarial_pass_rate = adversarial_passed / adversarial_total
         else:
             adversarial_pass_rate = 1.0
         
         # Average scores
-        avg_scores = {}
-        score_keys = ['safety_score', 'alignment_score', 'helpfulness_score', 'truthfulness_score']
-        
-        for key in score_keys:
-            scores = [r['evaluation']['scores'].get(key, 0) for r in results]
-            avg_scores[f'avg_{key}'] = sum(scores) / len(scores) if scores else 0
+        avg_scores = {f'avg_{key}': score_sums[key] / total for key in score_keys}
         
         return {
             'overall_pass_rate': passed / total,
@@ -278,10 +348,15 @@ class EvaluationPipeline:
         """Save results to file."""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
-        # Save detailed results as JSON
+        # Save detailed results as JSON. The results are already plain dicts,
+        # so a shallow view avoids asdict() deep-copying all of them
         results_file = self.output_dir / f'results_{timestamp}.json'
-        with open(results_file, 'w') as f:
-            json.dump(asdict(pipeline_result), f, indent=2, default=str)
+        payload = {
+            field.name: getattr(pipeline_result, field.name)
+            for field in fields(pipeline_result)
+        }
+        with open(results_file, 'wb') as f:
+            f.write(dumps(payload, default=str, indent=True))
         
         # Save summary report
         report_file = self.output_dir / f'report_{timestamp}.txt'
@@ -289,30 +364,40 @@ class EvaluationPipeline:
         
         logger.info(f"Results saved to {results_file} and {report_file}")
     
+    @staticmethod
+    def _dump_line(result: Dict[str, Any]) -> bytes:
+        """Serialize a single result as one newline-terminated JSON line."""
+        return dumps(result, default=str, newline=True)
+    
     def _generate_report(self, pipeline_result: PipelineResult, output_file: Path):
         """Generate a human-readable report."""
+        # Assemble the report in memory and write it out in one go
+        parts = [
+            "AI Alignment Evaluation Report\n",
+            "=" * 50 + "\n\n",
+            f"Timestamp: {pipeline_result.timestamp}\n",
+            f"Total Scenarios: {pipeline_result.scenarios_tested}\n",
+            f"Total Prompts: {pipeline_result.total_prompts}\n\n",
+            "Summary Metrics:\n",
+            "-" * 30 + "\n",
+        ]
+        parts.extend(
+            f"{metric}: {value:.3f}\n"
+            for metric, value in pipeline_result.summary_metrics.items()
+        )
+        
+        parts.append(f"\nFailures: {len(pipeline_result.failures)}\n")
+        if pipeline_result.failures:
+            parts.append("\nFailure Details:\n")
+            parts.append("-" * 30 + "\n")
+            for i, failure in enumerate(pipeline_result.failures[:10]):  # Show first 10
+                parts.append(f"\n{i+1}. Scenario: {failure.get('scenario', 'Unknown')}\n")
+                parts.append(f"   Prompt: {failure.get('prompt', 'N/A')[:100]}...\n")
+                if 'error' in failure:
+                    parts.append(f"   Error: {failure['error']}\n")
+        
         with open(output_file, 'w') as f:
-            f.write("AI Alignment Evaluation Report\n")
-            f.write("=" * 50 + "\n\n")
-            
-            f.write(f"Timestamp: {pipeline_result.timestamp}\n")
-            f.write(f"Total Scenarios: {pipeline_result.scenarios_tested}\n")
-            f.write(f"Total Prompts: {pipeline_result.total_prompts}\n\n")
-            
-            f.write("Summary Metrics:\n")
-            f.write("-" * 30 + "\n")
-            for metric, value in pipeline_result.summary_metrics.items():
-                f.write(f"{metric}: {value:.3f}\n")
-            
-            f.write(f"\nFailures: {len(pipeline_result.failures)}\n")
-            if pipeline_result.failures:
-                f.write("\nFailure Details:\n")
-                f.write("-" * 30 + "\n")
-                for i, failure in enumerate(pipeline_result.failures[:10]):  # Show first 10
-                    f.write(f"\n{i+1}. Scenario: {failure.get('scenario', 'Unknown')}\n")
-                    f.write(f"   Prompt: {failure.get('prompt', 'N/A')[:100]}...\n")
-                    if 'error' in failure:
-                        f.write(f"   Error: {failure['error']}\n")
+            f.write("".join(parts))
     
     def _generate_visualizations(self, pipeline_result: PipelineResult):
         """Generate visualization plots."""
@@ -322,26 +407,34 @@ class EvaluationPipeline:
         # TODO: Implement visualization generation
 
 
-def run_pipeline(config: Dict[str, Any]):
+def run_pipeline(config: Union[str, Dict[str, Any]]):
     """
     Convenience function to run the pipeline.
     
     Args:
         config: Configuration dictionary or path to config file
     """
-    if isinstance(config, dict):
-        # Save config to temporary file
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-            yaml.dump(config, f)
-            config_path = f.name
+    # Check before building the pipeline so its API client isn't leaked
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
     else:
-        config_path = config
-    
-    pipeline = EvaluationPipeline(config_path)
+        raise RuntimeError(
+            "run_pipeline() cannot be called from a running event loop; "
+            "await EvaluationPipeline(config).run_pipeline() instead"
+        )
     
-    # Run async pipeline
-    loop = asyncio.get_event_loop()
-    result = loop.run_until_complete(pipeline.run_pipeline())
+    # EvaluationPipeline takes either form directly
+    pipeline = EvaluationPipeline(config)
     
-    return result
\ No newline at end of file
+    # Run async pipeline on a fresh event loop that is closed afterwards
+    return asyncio.run(_run_and_close(pipeline))
+
+
+async def _run_and_close(pipeline: EvaluationPipeline) -> PipelineResult:
+    """Run a pipeline, then release its API client's connections."""
+    try:
+        return await pipeline.run_pipeline()
+    finally:
+        await pipeline.close()
\ No newline at end of file
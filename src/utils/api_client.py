@@ -3,31 +3,125 @@ API client for interacting with LLM providers.
 """
 
 import os
+import time
+import zlib
+import random
 import asyncio
-from typing import Dict, Any, Optional, List
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Any, Optional, List, Tuple
 from abc import ABC, abstractmethod
+from functools import lru_cache
 import aiohttp
 import openai
+import anthropic
 from anthropic import AsyncAnthropic
 import logging
 from dotenv import load_dotenv
 
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Errors worth retrying: rate limits, server-side failures and network
+# trouble. Anything else (bad request, auth, ...) fails the same way again
+TRANSIENT_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,  # Includes timeouts
+    openai.InternalServerError,
+    anthropic.RateLimitError,
+    anthropic.APIConnectionError,
+    anthropic.InternalServerError,
+    aiohttp.ClientConnectionError,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
+
+
+@lru_cache(maxsize=1)
+def _load_env():
+    """Load .env into the environment, once, when a real provider needs keys."""
+    load_dotenv()
+
 
 class BaseAPIClient(ABC):
     """Base class for API clients."""
     
+    # Upper bound on requests in flight for batch calls
+    max_concurrency: int = 10
+    
     @abstractmethod
     async def get_completion(self, prompt: str) -> str:
         """Get completion from the model."""
         pass
     
     @abstractmethod
-    async def get_batch_completions(self, prompts: List[str]) -> List[str]:
-        """Get completions for multiple prompts."""
+    async def get_batch_completions(
+        self,
+        prompts: List[str],
+        rate_limiter: Optional['RateLimiter'] = None
+    ) -> List[str]:
+        """Get completions for multiple prompts, optionally rate limited."""
+        pass
+    
+    async def _limited_completion(
+        self,
+        prompt: str,
+        rate_limiter: Optional['RateLimiter'] = None
+    ) -> str:
+        """Get a completion, first waiting on the rate limiter if given."""
+        if rate_limiter is None:
+            return await self.get_completion(prompt)
+        async with rate_limiter:
+            return await self.get_completion(prompt)
+    
+    async def _bounded_batch(
+        self,
+        prompts: List[str],
+        rate_limiter: Optional['RateLimiter'] = None
+    ) -> List[str]:
+        """Get completions in input order, at most max_concurrency at a time."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def complete(prompt: str) -> str:
+            async with semaphore:
+                return await self._limited_completion(prompt, rate_limiter)
+        
+        return await asyncio.gather(*[complete(prompt) for prompt in prompts])
+    
+    async def iter_completions(
+        self,
+        prompts: List[str],
+        rate_limiter: Optional['RateLimiter'] = None
+    ) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Yield completions as they arrive, at most max_concurrency at a time.
+        
+        Args:
+            prompts: Prompts to complete
+            rate_limiter: Optional rate limiter applied to every request
+            
+        Yields:
+            (index into prompts, completion) pairs in completion order
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def complete(index: int, prompt: str) -> Tuple[int, str]:
+            async with semaphore:
+                return index, await self._limited_completion(prompt, rate_limiter)
+        
+        tasks = [
+            asyncio.ensure_future(complete(index, prompt))
+            for index, prompt in enumerate(prompts)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Stop outstanding requests if the caller bails out early
+            for task in tasks:
+                task.cancel()
+    
+    async def close(self):
+        """Release any network resources held by the client."""
         pass
 
 
@@ -35,20 +129,24 @@ class OpenAIClient(BaseAPIClient):
     """Client for OpenAI API."""
     
     def __init__(self, config: Dict[str, Any]):
+        _load_env()
         self.api_key = os.getenv('OPENAI_API_KEY')
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY not found in environment")
             
-        openai.api_key = self.api_key
+        # One client per instance, so its pooled connections are reused
+        # across requests instead of paying a TCP/TLS handshake each time
+        self.client = openai.AsyncOpenAI(api_key=self.api_key)
         self.model = config.get('name', 'gpt-4')
         self.temperature = config.get('temperature', 0.7)
         self.max_tokens = config.get('max_tokens', 1000)
         self.top_p = config.get('top_p', 0.9)
+        self.max_concurrency = config.get('max_concurrency', self.max_concurrency)
         
     async def get_completion(self, prompt: str) -> str:
         """Get completion from OpenAI."""
         try:
-            response = await openai.ChatCompletion.acreate(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=self.temperature,
@@ -60,24 +158,34 @@ class OpenAIClient(BaseAPIClient):
             logger.error(f"OpenAI API error: {e}")
             raise
     
-    async def get_batch_completions(self, prompts: List[str]) -> List[str]:
+    async def get_batch_completions(
+        self,
+        prompts: List[str],
+        rate_limiter: Optional['RateLimiter'] = None
+    ) -> List[str]:
         """Get batch completions from OpenAI."""
-        tasks = [self.get_completion(prompt) for prompt in prompts]
-        return await asyncio.gather(*tasks)
+        return await self._bounded_batch(prompts, rate_limiter)
+    
+    async def close(self):
+        """Close the pooled HTTP connections."""
+        await self.client.close()
 
 
 class AnthropicClient(BaseAPIClient):
     """Client for Anthropic API."""
     
     def __init__(self, config: Dict[str, Any]):
+        _load_env()
         self.api_key = os.getenv('ANTHROPIC_API_KEY')
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment")
             
+        # AsyncAnthropic keeps a connection pool, shared by all requests
         self.client = AsyncAnthropic(api_key=self.api_key)
         self.model = config.get('name', 'claude-3-opus-20240229')
         self.temperature = config.get('temperature', 0.7)
         self.max_tokens = config.get('max_tokens', 1000)
+        self.max_concurrency = config.get('max_concurrency', self.max_concurrency)
         
     async def get_completion(self, prompt: str) -> str:
         """Get completion from Anthropic."""
@@ -93,10 +201,17 @@ class AnthropicClient(BaseAPIClient):
             logger.error(f"Anthropic API error: {e}")
             raise
     
-    async def get_batch_completions(self, prompts: List[str]) -> List[str]:
+    async def get_batch_completions(
+        self,
+        prompts: List[str],
+        rate_limiter: Optional['RateLimiter'] = None
+    ) -> List[str]:
         """Get batch completions from Anthropic."""
-        tasks = [self.get_completion(prompt) for prompt in prompts]
-        return await asyncio.gather(*tasks)
+        return await self._bounded_batch(prompts, rate_limiter)
+    
+    async def close(self):
+        """Close the pooled HTTP connections."""
+        await self.client.close()
 
 
 class MockClient(BaseAPIClient):
@@ -110,18 +225,35 @@ class MockClient(BaseAPIClient):
             "Here's a helpful response to your question: [safe content]",
             "I understand you're curious, but I can't assist with that particular request."
         ]
-        self.response_index = 0
+        # Simulated API delay in seconds (0 just yields to the event loop)
+        self.latency = config.get('mock_latency', 0.1)
+        
+    def _response_for(self, prompt: str) -> str:
+        """Pick a canned response for the prompt.
+        
+        The choice depends only on the prompt (crc32 is stable across runs,
+        unlike hash()), not on the order in which concurrent calls land.
+        """
+        return self.responses[zlib.crc32(prompt.encode('utf-8')) % len(self.responses)]
         
     async def get_completion(self, prompt: str) -> str:
         """Return mock response."""
-        response = self.responses[self.response_index % len(self.responses)]
-        self.response_index += 1
-        await asyncio.sleep(0.1)  # Simulate API delay
+        response = self._response_for(prompt)
+        await asyncio.sleep(self.latency)  # Simulate API delay
         return response
     
-    async def get_batch_completions(self, prompts: List[str]) -> List[str]:
-        """Get batch mock responses."""
-        return [await self.get_completion(p) for p in prompts]
+    async def get_batch_completions(
+        self,
+        prompts: List[str],
+        rate_limiter: Optional['RateLimiter'] = None
+    ) -> List[str]:
+        """Get batch mock responses, paying the simulated delay once."""
+        if rate_limiter is not None:
+            for _ in prompts:
+                await rate_limiter.wait_if_needed()
+        responses = [self._response_for(prompt) for prompt in prompts]
+        await asyncio.sleep(self.latency)
+        return responses
 
 
 class APIClient:
@@ -138,58 +270,142 @@ class APIClient:
             self.client = MockClient(config)
         else:
             raise ValueError(f"Unknown provider: {provider}")
+        
+        # Optional exact-match cache so repeated prompts skip the API call
+        self.cache_responses = config.get('cache_responses', False)
+        self.response_cache: Dict[str, str] = {}
+        
+        # Optional limit on requests sent to the provider (cache hits are free)
+        calls_per_minute = config.get('calls_per_minute')
+        self.rate_limiter = RateLimiter(calls_per_minute) if calls_per_minute else None
     
     async def get_completion(self, prompt: str) -> str:
         """Get completion from the configured provider."""
-        return await self.client.get_completion(prompt)
+        if not self.cache_responses:
+            return await self.client._limited_completion(prompt, self.rate_limiter)
+        
+        if prompt not in self.response_cache:
+            self.response_cache[prompt] = await self.client._limited_completion(
+                prompt, self.rate_limiter
+            )
+        return self.response_cache[prompt]
     
     async def get_batch_completions(self, prompts: List[str]) -> List[str]:
         """Get batch completions from the configured provider."""
-        return await self.client.get_batch_completions(prompts)
+        if not self.cache_responses:
+            return await self.client.get_batch_completions(prompts, self.rate_limiter)
+        
+        # Only request prompts not already cached, each one once
+        misses = list(dict.fromkeys(p for p in prompts if p not in self.response_cache))
+        if misses:
+            responses = await self.client.get_batch_completions(misses, self.rate_limiter)
+            self.response_cache.update(zip(misses, responses))
+        
+        return [self.response_cache[p] for p in prompts]
+    
+    async def iter_completions(self, prompts: List[str]) -> AsyncIterator[Tuple[int, str]]:
+        """Yield (index, completion) pairs as completions arrive."""
+        if not self.cache_responses:
+            async for item in self.client.iter_completions(prompts, self.rate_limiter):
+                yield item
+            return
+        
+        # Serve cache hits right away, then request each missing prompt once
+        pending: Dict[str, List[int]] = {}
+        for index, prompt in enumerate(prompts):
+            if prompt in self.response_cache:
+                yield index, self.response_cache[prompt]
+            else:
+                pending.setdefault(prompt, []).append(index)
+        
+        misses = list(pending)
+        async for miss_index, response in self.client.iter_completions(misses, self.rate_limiter):
+            prompt = misses[miss_index]
+            self.response_cache[prompt] = response
+            for index in pending[prompt]:
+                yield index, response
+    
+    async def close(self):
+        """Release the provider client's network resources."""
+        await self.client.close()
 
 
 class RateLimiter:
-    """Simple rate limiter for API calls."""
+    """Simple rate limiter for API calls.
+    
+    Use ``await limiter.wait_if_needed()`` before each call, or wrap the
+    call in ``async with limiter:``. Concurrent tasks sharing a limiter
+    wait their turn, so the limit holds across ``asyncio.gather``.
+    """
     
     def __init__(self, calls_per_minute: int = 60):
         self.calls_per_minute = calls_per_minute
-        self.call_times = []
+        # Call times in ascending order, oldest on the left
+        self.call_times: Deque[float] = deque()
+        self._lock: Optional[asyncio.Lock] = None  # Created inside the running loop
         
+    async def __aenter__(self) -> 'RateLimiter':
+        await self.wait_if_needed()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+    
     async def wait_if_needed(self):
         """Wait if rate limit would be exceeded."""
-        now = asyncio.get_event_loop().time()
+        if self._lock is None:
+            self._lock = asyncio.Lock()
         
-        # Remove calls older than 1 minute
-        self.call_times = [t for t in self.call_times if now - t < 60]
-        
-        if len(self.call_times) >= self.calls_per_minute:
-            # Calculate wait time
-            oldest_call = min(self.call_times)
-            wait_time = 60 - (now - oldest_call) + 0.1
-            await asyncio.sleep(wait_time)
-        
-        self.call_times.append(now)
+        # One waiter at a time, so concurrent callers can't all claim a slot
+        async with self._lock:
+            now = time.monotonic()
+            
+            # Remove calls older than 1 minute
+            while self.call_times and now - self.call_times[0] >= 60:
+                self.call_times.popleft()
+            
+            if len(self.call_times) >= self.calls_per_minute:
+                # Calculate wait time
+                oldest_call = self.call_times[0]
+                wait_time = 60 - (now - oldest_call) + 0.1
+                await asyncio.sleep(wait_time)
+                # Record when the call actually goes out, keeping the deque sorted
+                now = time.monotonic()
+            
+            self.call_times.append(now)
 
 
 class RetryHandler:
     """Handle retries for failed API calls."""
     
-    def __init__(self, max_retries: int = 3, backoff_factor: float = 2.0):
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 2.0,
+        max_wait: float = 60.0,
+        retry_on: Tuple[type, ...] = TRANSIENT_ERRORS
+    ):
         self.max_retries = max_retries
         self.backoff_factor = backoff_factor
+        self.max_wait = max_wait
+        self.retry_on = retry_on
         
     async def retry_async(self, func, *args, **kwargs):
-        """Retry an async function with exponential backoff."""
+        """Retry an async function on transient errors with jittered exponential backoff."""
         last_exception = None
         
         for attempt in range(self.max_retries):
             try:
                 return await func(*args, **kwargs)
-            except Exception as e:
+            except self.retry_on as e:
                 last_exception = e
                 if attempt < self.max_retries - 1:
-                    wait_time = self.backoff_factor ** attempt
-                    logger.warning(f"Attempt {attempt + 1} failed, retrying in {wait_time}s: {e}")
+                    # Full jitter keeps calls that failed together from
+                    # all retrying at the same moment
+                    wait_time = random.uniform(
+                        0, min(self.max_wait, self.backoff_factor ** attempt)
+                    )
+                    logger.warning(f"Attempt {attempt + 1} failed, retrying in {wait_time:.2f}s: {e}")
                     await asyncio.sleep(wait_time)
                 else:
                     logger.error(f"All {self.max_retries} attempts failed")
@@ -2,12 +2,16 @@
 Logging utilities for the alignment debugging suite.
 """
 
+import atexit
 import logging
+import queue
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
-import json
+from typing import Dict, Optional
+from .serialization import dumps
 
 
 class ColoredFormatter(logging.Formatter):
@@ -23,9 +27,15 @@ class ColoredFormatter(logging.Formatter):
     RESET = '\033[0m'
     
     def format(self, record):
-        log_color = self.COLORS.get(record.levelname, self.RESET)
-        record.levelname = f"{log_color}{record.levelname}{self.RESET}"
-        return super().format(record)
+        # The record is shared with the logger's other handlers, so put the
+        # plain level name back once this line is formatted
+        levelname = record.levelname
+        log_color = self.COLORS.get(levelname, self.RESET)
+        record.levelname = f"{log_color}{levelname}{self.RESET}"
+        try:
+            return super().format(record)
+        finally:
+            record.levelname = levelname
 
 
 class JSONFormatter(logging.Formatter):
@@ -33,7 +43,7 @@ class JSONFormatter(logging.Formatter):
     
     def format(self, record):
         log_data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -48,7 +58,7 @@ class JSONFormatter(logging.Formatter):
         if record.exc_info:
             log_data['exception'] = self.formatException(record.exc_info)
             
-        return json.dumps(log_data)
+        return dumps(log_data).decode('utf-8')
 
 
 def setup_logger(
@@ -143,17 +153,89 @@ class LogContext:
         logging.setLogRecordFactory(self.old_factory)
 
 
+class _PassthroughQueueHandler(QueueHandler):
+    """Queue records unformatted, so the listener's formatter sees exc_info."""
+    
+    def prepare(self, record):
+        return record
+
+
+class _MetricsWriter:
+    """Queue and writer thread shared by the MetricsLoggers of one name."""
+    
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self.refs = 0
+        self.queue = queue.Queue()
+        self.handlers = list(logger.handlers)
+        for handler in self.handlers:
+            logger.removeHandler(handler)
+        self.queue_handler = _PassthroughQueueHandler(self.queue)
+        logger.addHandler(self.queue_handler)
+        self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+    
+    def stop(self):
+        """Drain the queue, stop the thread and close the file handlers."""
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+        self.logger.removeHandler(self.queue_handler)
+
+
+# Writers for open MetricsLoggers, keyed by logger name
+_metrics_writers: Dict[str, _MetricsWriter] = {}
+_metrics_writers_lock = threading.Lock()
+
+
 class MetricsLogger:
-    """Logger specifically for metrics and performance data."""
+    """Logger specifically for metrics and performance data.
+    
+    Metric records are queued and written to ``metrics_file`` by a
+    background thread, so logging a metric never waits on disk I/O.
+    Call ``flush()`` to wait until everything logged so far is written.
+    """
     
     def __init__(self, name: str, metrics_file: str):
-        self.logger = setup_logger(
-            f"{name}_metrics",
-            level='INFO',
-            log_file=metrics_file,
-            console=False,
-            json_format=True
-        )
+        # Route records through a queue; the listener thread owns the file
+        # handler. Instances with the same name share one writer
+        with _metrics_writers_lock:
+            self.logger = setup_logger(
+                f"{name}_metrics",
+                level='INFO',
+                log_file=metrics_file,
+                console=False,
+                json_format=True
+            )
+            writer = _metrics_writers.get(self.logger.name)
+            if writer is None:
+                writer = _MetricsWriter(self.logger)
+                _metrics_writers[self.logger.name] = writer
+            writer.refs += 1
+        self._writer: Optional[_MetricsWriter] = writer
+        atexit.register(self.close)
+    
+    def flush(self):
+        """Block until all metrics logged so far have been written."""
+        if self._writer is not None:
+            self._writer.queue.join()
+    
+    def close(self):
+        """Write any pending metrics and release this instance's writer.
+        
+        The writer thread stops and the file is closed once every
+        instance sharing it has been closed.
+        """
+        atexit.unregister(self.close)
+        with _metrics_writers_lock:
+            writer, self._writer = self._writer, None
+            if writer is None:
+                return
+            writer.refs -= 1
+            if writer.refs == 0:
+                # Let a later MetricsLogger for this name set up its own file
+                del _metrics_writers[self.logger.name]
+                writer.stop()
         
     def log_metric(self, metric_name: str, value: float, **tags):
         """Log a metric with optional tags."""
@@ -0,0 +1,44 @@
+"""
+JSON serialization helpers shared by the suite's writers.
+"""
+
+import json
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; the stdlib encoder is used instead
+    orjson = None
+
+
+def dumps(
+    obj: Any,
+    default: Optional[Callable[[Any], Any]] = None,
+    indent: bool = False,
+    newline: bool = False
+) -> bytes:
+    """
+    Serialize an object to UTF-8 JSON, using orjson when it is installed.
+
+    Args:
+        obj: Object to serialize
+        default: Called for objects JSON can't encode (e.g. ``str``)
+        indent: Indent nested values by two spaces
+        newline: Append a trailing newline
+
+    Returns:
+        Encoded JSON bytes
+    """
+    if orjson is not None:
+        # Non-string keys are allowed, as they are by json.dumps
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if newline:
+            option |= orjson.OPT_APPEND_NEWLINE
+        return orjson.dumps(obj, default=default, option=option)
+
+    text = json.dumps(obj, default=default, indent=2 if indent else None)
+    if newline:
+        text += "\n"
+    return text.encode('utf-8')
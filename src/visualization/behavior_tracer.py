@@ -2,14 +2,19 @@
 Behavior tracer for visualizing model reasoning chains.
 """
 
-import json
+from collections import Counter, defaultdict
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 from matplotlib.patches import FancyBboxPatch
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.path import Path
 import networkx as nx
+import numpy as np
+
+from ..utils.serialization import dumps
 
 
 @dataclass
@@ -35,30 +40,69 @@ class ReasoningEdge:
 class BehaviorTracer:
     """Traces and visualizes model behavior and reasoning chains."""
     
+    # Arrowhead size for trace edges, in layout (data) units
+    ARROW_HEAD_LENGTH = 0.04
+    ARROW_HEAD_WIDTH = 0.015
+    
     def __init__(self):
         self.nodes: List[ReasoningNode] = []
         self.edges: List[ReasoningEdge] = []
-        self.graph = nx.DiGraph()
+        # Graph view of nodes/edges, built on first use and reset on change
+        self._graph: Optional[nx.DiGraph] = None
+        # Running indexes, so lookups and summaries don't rescan every node
+        self._trace_nodes: Dict[str, List[ReasoningNode]] = defaultdict(list)
+        self._scores_by_metric: Dict[str, List[float]] = defaultdict(list)
+        self._decisions: Counter = Counter()
+        # Layout positions per trace_id (None = whole graph); reset on change
+        self._layout_cache: Dict[Optional[str], Dict[str, Any]] = {}
         
     def add_node(self, node: ReasoningNode):
         """Add a node to the reasoning chain."""
         self.nodes.append(node)
-        
-        # Add to graph with attributes
-        self.graph.add_node(
-            node.id,
-            content=node.content[:50] + "..." if len(node.content) > 50 else node.content,
-            node_type=node.node_type,
-            safety_score=node.safety_score,
-            full_content=node.content
-        )
+        self._graph = None
+        self._layout_cache.clear()
+        trace_id = node.metadata.get('trace_id')
+        if trace_id:
+            self._trace_nodes[trace_id].append(node)
+        if node.node_type == 'evaluation' and 'metric' in node.metadata:
+            self._scores_by_metric[node.metadata['metric']].append(node.metadata['score'])
+        elif node.node_type == 'decision':
+            self._decisions[node.metadata['decision']] += 1
         
     def add_edge(self, edge: ReasoningEdge):
         """Add an edge to the reasoning chain."""
         self.edges.append(edge)
-        self.graph.add_edge(edge.source, edge.target, 
-                          edge_type=edge.edge_type, 
-                          weight=edge.weight)
+        self._graph = None
+        self._layout_cache.clear()
+        
+    @property
+    def graph(self) -> nx.DiGraph:
+        """
+        The reasoning chain as a DiGraph.
+        
+        Only visualization needs the graph, so it is built in bulk from
+        ``nodes`` and ``edges`` on first access rather than kept in sync
+        on every add.
+        """
+        if self._graph is None:
+            graph = nx.DiGraph()
+            graph.add_nodes_from(
+                (node.id, {
+                    'node_type': node.node_type,
+                    'safety_score': node.safety_score,
+                    'full_content': node.content
+                })
+                for node in self.nodes
+            )
+            graph.add_edges_from(
+                (edge.source, edge.target, {
+                    'edge_type': edge.edge_type,
+                    'weight': edge.weight
+                })
+                for edge in self.edges
+            )
+            self._graph = graph
+        return self._graph
         
     def trace_evaluation(self, prompt: str, response: str, 
                         evaluation_result: Dict[str, Any]) -> str:
@@ -111,7 +155,7 @@ class BehaviorTracer:
                 content=f"{metric}: {score:.2f}",
                 node_type="evaluation",
                 timestamp=timestamp,
-                metadata={"metric": metric, "score": score},
+                metadata={"trace_id": trace_id, "metric": metric, "score": score},
                 safety_score=score
             )
             self.add_node(eval_node)
@@ -130,7 +174,7 @@ class BehaviorTracer:
             content=f"Decision: {decision}",
             node_type="decision",
             timestamp=timestamp,
-            metadata={"decision": decision}
+            metadata={"trace_id": trace_id, "decision": decision}
         )
         self.add_node(decision_node)
         
@@ -157,17 +201,31 @@ class BehaviorTracer:
         """
         # Filter nodes if trace_id provided
         if trace_id:
-            nodes_to_show = [n for n in self.graph.nodes() 
-                           if trace_id in n]
-            subgraph = self.graph.subgraph(nodes_to_show)
+            if trace_id in self._trace_nodes:
+                nodes_to_show = [n.id for n in self._trace_nodes[trace_id]]
+            else:
+                # Not a recorded trace id; fall back to matching node ids
+                nodes_to_show = [n for n in self.graph.nodes() 
+                               if trace_id in n]
+            # Zero-copy filtered view rather than a materialized subgraph
+            node_filter = set(nodes_to_show)
+            subgraph = nx.subgraph_view(self.graph, filter_node=node_filter.__contains__)
         else:
             subgraph = self.graph
         
         # Create figure
         fig, ax = plt.subplots(figsize=(12, 8))
         
-        # Layout
-        pos = nx.spring_layout(subgraph, k=2, iterations=50)
+        # Layout (reused until the graph changes; seeded so it is repeatable)
+        pos = self._layout_cache.get(trace_id)
+        if pos is None:
+            # Scale spacing and iteration budget with the node count so large
+            # traces don't spend most of their time in the force loop
+            n = max(subgraph.number_of_nodes(), 1)
+            iterations = max(10, min(50, 500 // n))
+            pos = nx.spring_layout(subgraph, k=2 / np.sqrt(n),
+                                   iterations=iterations, seed=0)
+            self._layout_cache[trace_id] = pos
         
         # Color mapping for node types
         color_map = {
@@ -177,7 +235,17 @@ class BehaviorTracer:
             'decision': '#B4FFB4'     # Light green
         }
         
-        # Draw nodes
+        # Draw nodes: every box is the same rounded rectangle, so build its
+        # Bezier path once and translate a copy to each node position, then
+        # draw them all as one collection
+        box_path = FancyBboxPatch(
+            (-0.15, -0.05),
+            0.3, 0.1,
+            boxstyle="round,pad=0.02"
+        ).get_path()
+        boxes = []
+        face_colors = []
+        labels = []
         for node_id in subgraph.nodes():
             node_data = subgraph.nodes[node_id]
             node_type = node_data['node_type']
@@ -197,46 +265,75 @@ class BehaviorTracer:
             else:
                 face_color = color_map.get(node_type, '#CCCCCC')
             
-            # Create fancy box
-            content = node_data['full_content'] if show_full_content else node_data['content']
+            # Create fancy box (the 50-char preview is only built for display)
+            content = node_data['full_content']
+            if not show_full_content and len(content) > 50:
+                content = content[:50] + "..."
             
             # Wrap long content
             if len(content) > 30 and not show_full_content:
                 content = '\n'.join([content[i:i+30] 
                                    for i in range(0, len(content), 30)])
             
-            box = FancyBboxPatch(
-                (x - 0.15, y - 0.05),
-                0.3, 0.1,
-                boxstyle="round,pad=0.02",
-                facecolor=face_color,
-                edgecolor='black',
-                linewidth=1.5
-            )
-            ax.add_patch(box)
-            
-            # Add text
+            boxes.append(Path(box_path.vertices + (x, y), box_path.codes))
+            face_colors.append(face_color)
+            labels.append((x, y, content))
+        
+        if boxes:
+            ax.add_collection(PathCollection(
+                boxes,
+                facecolors=face_colors,
+                edgecolors='black',
+                linewidths=1.5
+            ))
+            ax.autoscale_view()
+        
+        # Add text
+        for x, y, content in labels:
             ax.text(x, y, content, ha='center', va='center', 
                    fontsize=8, weight='bold')
         
-        # Draw edges
-        for edge in subgraph.edges():
-            source_pos = pos[edge[0]]
-            target_pos = pos[edge[1]]
-            edge_data = subgraph.edges[edge]
+        # Draw edges: one LineCollection per edge type, holding both the
+        # shafts and the open '->' heads, instead of an annotation per edge
+        arrow_styles = {
+            'leads_to': dict(lw=2, color='blue', linestyle='solid'),
+            'evaluates': dict(lw=1.5, color='orange', linestyle='solid'),
+            'triggers': dict(lw=1, color='green', linestyle='dashed')
+        }
+        default_style = dict(lw=1, color='gray', linestyle='solid')
+        
+        segments_by_type = defaultdict(list)
+        for source, target, edge_data in subgraph.edges(data=True):
+            segments_by_type[edge_data['edge_type']].append((pos[source], pos[target]))
+        
+        for edge_type, segments in segments_by_type.items():
+            style = arrow_styles.get(edge_type, default_style)
             
-            # Arrow style based on edge type
-            arrow_styles = {
-                'leads_to': dict(arrowstyle='->', lw=2, color='blue'),
-                'evaluates': dict(arrowstyle='->', lw=1.5, color='orange'),
-                'triggers': dict(arrowstyle='->', lw=1, color='green', linestyle='dashed')
-            }
+            starts = np.array([s for s, _ in segments], dtype=float)
+            ends = np.array([t for _, t in segments], dtype=float)
+            
+            # Arrowhead barbs, computed for all edges of this type at once
+            direction = ends - starts
+            length = np.hypot(direction[:, 0], direction[:, 1])[:, None]
+            unit = np.divide(direction, length, out=np.zeros_like(direction),
+                             where=length > 0)
+            normal = np.column_stack([-unit[:, 1], unit[:, 0]])
+            back = ends - unit * self.ARROW_HEAD_LENGTH
+            left = back + normal * self.ARROW_HEAD_WIDTH
+            right = back - normal * self.ARROW_HEAD_WIDTH
             
-            style = arrow_styles.get(edge_data['edge_type'], 
-                                    dict(arrowstyle='->', lw=1, color='gray'))
+            shafts = np.stack([starts, ends], axis=1)
+            heads = np.concatenate([
+                np.stack([left, ends], axis=1),
+                np.stack([right, ends], axis=1)
+            ])
             
-            ax.annotate('', xy=target_pos, xytext=source_pos,
-                       arrowprops=style)
+            ax.add_collection(LineCollection(
+                np.concatenate([shafts, heads]),
+                colors=style['color'],
+                linewidths=style['lw'],
+                linestyles=[style['linestyle']] * len(shafts) + ['solid'] * len(heads)
+            ), autolim=False)
         
         # Add legend
         legend_elements = [
@@ -264,8 +361,7 @@ class BehaviorTracer:
     
     def get_trace_summary(self, trace_id: str) -> Dict[str, Any]:
         """Get summary statistics for a trace."""
-        trace_nodes = [n for n in self.nodes 
-                      if n.metadata.get('trace_id') == trace_id]
+        trace_nodes = self._trace_nodes.get(trace_id, [])
         
         if not trace_nodes:
             return {}
@@ -289,46 +385,42 @@ class BehaviorTracer:
         }
     
     def export_traces(self, output_file: str):
-        """Export all traces to JSON file."""
-        traces = []
+        """
+        Export all traces to a JSON file.
         
-        # Group nodes by trace
-        trace_ids = set(n.metadata.get('trace_id') 
-                       for n in self.nodes 
-                       if 'trace_id' in n.metadata)
+        Summaries are serialized and written one trace at a time, so the
+        full list is never held in memory.
         
-        for trace_id in trace_ids:
-            if trace_id:
+        Args:
+            output_file: Path of the JSON array to write
+        """
+        with open(output_file, 'wb') as f:
+            f.write(b'[')
+            for i, trace_id in enumerate(self._trace_nodes):
                 summary = self.get_trace_summary(trace_id)
-                traces.append(summary)
-        
-        with open(output_file, 'w') as f:
-            json.dump(traces, f, indent=2, default=str)
+                if i:
+                    f.write(b',')
+                f.write(b'\n')
+                f.write(self._dump_summary(summary))
+            f.write(b'\n]\n')
+    
+    @staticmethod
+    def _dump_summary(summary: Dict[str, Any]) -> bytes:
+        """Serialize one trace summary."""
+        return dumps(summary, default=str)
     
     def analyze_patterns(self) -> Dict[str, Any]:
         """Analyze patterns in traced behaviors."""
         if not self.nodes:
             return {}
         
-        # Collect all evaluation scores
-        all_scores = {}
-        for node in self.nodes:
-            if node.node_type == 'evaluation' and 'metric' in node.metadata:
-                metric = node.metadata['metric']
-                score = node.metadata['score']
-                if metric not in all_scores:
-                    all_scores[metric] = []
-                all_scores[metric].append(score)
-        
-        # Calculate statistics
+        # Calculate statistics from the scores indexed in add_node
         patterns = {
-            'total_traces': len(set(n.metadata.get('trace_id') 
-                                  for n in self.nodes 
-                                  if 'trace_id' in n.metadata)),
+            'total_traces': len(self._trace_nodes),
             'metrics': {}
         }
         
-        for metric, scores in all_scores.items():
+        for metric, scores in self._scores_by_metric.items():
             patterns['metrics'][metric] = {
                 'mean': sum(scores) / len(scores),
                 'min': min(scores),
@@ -337,13 +429,9 @@ class BehaviorTracer:
             }
         
         # Decision distribution
-        decisions = [n.metadata['decision'] 
-                    for n in self.nodes 
-                    if n.node_type == 'decision']
-        
         patterns['decision_distribution'] = {
-            'SAFE': decisions.count('SAFE'),
-            'UNSAFE': decisions.count('UNSAFE')
+            'SAFE': self._decisions['SAFE'],
+            'UNSAFE': self._decisions['UNSAFE']
         }
         
         return patterns
\ No newline at end of file
@@ -5,37 +5,182 @@ Heatmap generator for visualizing alignment patterns.
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from typing import List, Dict, Any, Optional, Tuple
 import pandas as pd
-from datetime import datetime
 import json
+from collections import Counter
+
+
+def _pairwise_corr(values: np.ndarray) -> np.ndarray:
+    """
+    Pearson correlation between columns, ignoring NaNs pairwise.
+    
+    Matches ``DataFrame.corr()``: each pair of metrics is correlated over
+    the rows where both are present.
+    
+    Args:
+        values: (rows, metrics) array with NaN for missing scores
+        
+    Returns:
+        (metrics, metrics) correlation matrix, NaN where undefined
+    """
+    present = ~np.isnan(values)
+    mask = present.astype(np.float64)
+    
+    # Shift each column by one of its own values. Correlation is shift
+    # invariant, and this keeps the one-pass sums below from cancelling:
+    # a constant column becomes exactly zero instead of leaving rounding
+    # noise that would pass for a (tiny) nonzero variance
+    first = np.argmax(present, axis=0)
+    shift = values[first, np.arange(values.shape[1])]
+    x = np.where(present, values - np.nan_to_num(shift), 0.0)
+    
+    # Pairwise-complete sums for every metric pair, as matrix products
+    n = mask.T @ mask
+    sum_x = x.T @ mask
+    sum_y = sum_x.T
+    sum_xx = (x * x).T @ mask
+    sum_yy = sum_xx.T
+    sum_xy = x.T @ x
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sum_xy - sum_x * sum_y / n
+        var_x = sum_xx - sum_x * sum_x / n
+        var_y = sum_yy - sum_y * sum_y / n
+        corr = cov / np.sqrt(var_x * var_y)
+    
+    # Undefined with fewer than two shared observations or zero variance;
+    # variances at rounding level relative to the raw sums count as zero
+    tol = 1e-12
+    corr[(n < 2) | (var_x <= tol * sum_xx) | (var_y <= tol * sum_yy)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
 
 
 class HeatmapGenerator:
     """Generates heatmaps for visualizing alignment patterns and errors."""
     
+    # Grids larger than this are drawn without per-cell text annotations
+    max_annot_cells = 400
+    
     def __init__(self):
         self.data = []
         self.categories = set()
         self.metrics = set()
+        # Sorted labels and label -> position maps, rebuilt only when a new
+        # category or metric shows up
+        self._category_order: Optional[Tuple[List[str], Dict[str, int]]] = None
+        self._metric_order: Optional[Tuple[List[str], Dict[str, int]]] = None
         
     def add_result(self, result: Dict[str, Any]):
         """Add a single evaluation result."""
         self.data.append(result)
-        if 'category' in result:
+        if 'category' in result and result['category'] not in self.categories:
             self.categories.add(result['category'])
+            self._category_order = None
         if 'evaluation' in result and 'scores' in result['evaluation']:
-            self.metrics.update(result['evaluation']['scores'].keys())
+            scores = result['evaluation']['scores']
+            if not self.metrics.issuperset(scores):
+                self.metrics.update(scores)
+                self._metric_order = None
     
     def add_results(self, results: List[Dict[str, Any]]):
         """Add multiple evaluation results."""
         for result in results:
             self.add_result(result)
     
+    def _category_index(self) -> Tuple[List[str], Dict[str, int]]:
+        """Sorted categories and their row positions (cached)."""
+        if self._category_order is None:
+            categories = sorted(self.categories)
+            self._category_order = (
+                categories, {category: i for i, category in enumerate(categories)}
+            )
+        return self._category_order
+    
+    def _metric_index(self) -> Tuple[List[str], Dict[str, int]]:
+        """Sorted metrics and their column positions (cached)."""
+        if self._metric_order is None:
+            metrics = sorted(self.metrics)
+            self._metric_order = (
+                metrics, {metric: j for j, metric in enumerate(metrics)}
+            )
+        return self._metric_order
+    
+    def _prepare_figure(
+        self,
+        fig: Optional[Figure],
+        figsize: Tuple[int, int],
+        output_file: Optional[str]
+    ) -> Tuple[Figure, Any]:
+        """
+        Get a figure and axes to draw a heatmap on.
+        
+        A passed-in figure is cleared (which also drops the previous
+        colorbar) and resized, so one figure can be reused across plots.
+        Figures that are only saved to disk are plain Agg figures that
+        bypass pyplot; pyplot is only used when the plot is shown.
+        
+        Args:
+            fig: Figure to reuse, or None to create a new one
+            figsize: Figure size
+            output_file: Target file, or None to show the plot
+            
+        Returns:
+            Tuple of (figure, axes)
+        """
+        if fig is None:
+            if not output_file:
+                return plt.subplots(figsize=figsize)
+            fig = Figure(figsize=figsize)
+            FigureCanvasAgg(fig)
+        else:
+            fig.clf()
+            fig.set_size_inches(figsize)
+        
+        return fig, fig.add_subplot()
+    
+    def _finish_figure(self, fig: Figure, output_file: Optional[str], owns_figure: bool):
+        """Save or show a finished heatmap, closing pyplot figures we created."""
+        fig.tight_layout()
+        
+        if output_file:
+            fig.savefig(output_file, dpi=300, bbox_inches='tight')
+        else:
+            plt.show()
+            if owns_figure:
+                plt.close(fig)
+    
+    def _draw_heatmap(self, data, **kwargs):
+        """
+        Draw a seaborn heatmap with a rasterized cell mesh.
+        
+        Cell annotations are dropped once the grid exceeds
+        ``max_annot_cells``, since each one is a separate Text artist.
+        
+        Args:
+            data: Matrix or DataFrame to plot
+            **kwargs: Passed through to ``sns.heatmap``
+            
+        Returns:
+            The axes the heatmap was drawn on
+        """
+        if np.size(data) > self.max_annot_cells:
+            kwargs['annot'] = False
+        
+        ax = sns.heatmap(data, **kwargs)
+        
+        # Rasterize the QuadMesh; axes, labels and colorbar stay vector
+        ax.collections[0].set_rasterized(True)
+        
+        return ax
+    
     def generate_alignment_heatmap(
         self, 
         output_file: Optional[str] = None,
-        figsize: Tuple[int, int] = (12, 8)
+        figsize: Tuple[int, int] = (12, 8),
+        fig: Optional[Figure] = None
     ):
         """
         Generate a heatmap showing alignment scores across categories and metrics.
@@ -43,46 +188,57 @@ class HeatmapGenerator:
         Args:
             output_file: Save to file if provided
             figsize: Figure size
+            fig: Existing figure to clear and draw on (a new one is created if None)
         """
         if not self.data:
             raise ValueError("No data available for heatmap generation")
         
         # Prepare data matrix
-        categories = sorted(list(self.categories))
-        metrics = sorted(list(self.metrics))
+        categories, cat_index = self._category_index()
+        metrics, metric_index = self._metric_index()
         
-        # Initialize matrix
-        matrix = np.zeros((len(categories), len(metrics)))
-        counts = np.zeros((len(categories), len(metrics)))
-        
-        # Fill matrix with average scores
+        # Gather (category, metric, score) triples in one pass
+        rows, cols, values = [], [], []
         for result in self.data:
             if 'category' not in result or 'evaluation' not in result:
                 continue
                 
-            cat_idx = categories.index(result['category'])
+            row = cat_index[result['category']]
             scores = result['evaluation'].get('scores', {})
             
             for metric, score in scores.items():
-                if metric in metrics:
-                    metric_idx = metrics.index(metric)
-                    matrix[cat_idx, metric_idx] += score
-                    counts[cat_idx, metric_idx] += 1
+                col = metric_index.get(metric)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+                    values.append(score)
         
-        # Calculate averages
-        with np.errstate(divide='ignore', invalid='ignore'):
-            matrix = np.divide(matrix, counts)
-            matrix = np.nan_to_num(matrix, nan=0.0)
+        # Scatter-add the scores and counts into the matrices
+        matrix = np.zeros((len(categories), len(metrics)))
+        counts = np.zeros((len(categories), len(metrics)))
+        index = (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp))
+        np.add.at(matrix, index, np.asarray(values, dtype=np.float64))
+        np.add.at(counts, index, 1.0)
+        
+        # Nothing to plot; skip figure creation and seaborn entirely
+        if not counts.any():
+            print("No score data available")
+            return
+        
+        # Calculate averages (0 where a category has no score for a metric)
+        matrix = np.divide(matrix, counts, out=np.zeros_like(matrix), where=counts > 0)
         
         # Create heatmap
-        fig, ax = plt.subplots(figsize=figsize)
+        owns_figure = fig is None
+        fig, ax = self._prepare_figure(fig, figsize, output_file)
         
         # Create custom colormap (red to yellow to green)
         cmap = sns.diverging_palette(10, 130, as_cmap=True)
         
         # Plot heatmap
-        sns.heatmap(
+        self._draw_heatmap(
             matrix,
+            ax=ax,
             annot=True,
             fmt='.2f',
             cmap=cmap,
@@ -97,31 +253,24 @@ class HeatmapGenerator:
         )
         
         # Customize
-        plt.title('Alignment Scores Heatmap', fontsize=16, weight='bold', pad=20)
-        plt.xlabel('Metrics', fontsize=12, weight='bold')
-        plt.ylabel('Categories', fontsize=12, weight='bold')
+        ax.set_title('Alignment Scores Heatmap', fontsize=16, weight='bold', pad=20)
+        ax.set_xlabel('Metrics', fontsize=12, weight='bold')
+        ax.set_ylabel('Categories', fontsize=12, weight='bold')
         
         # Rotate x labels for better readability
-        plt.xticks(rotation=45, ha='right')
+        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
         
         # Add grid
         ax.set_facecolor('#f0f0f0')
         
-        # Tight layout
-        plt.tight_layout()
-        
-        # Save or show
-        if output_file:
-            plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        else:
-            plt.show()
-            
-        plt.close()
+        # Tight layout, then save or show
+        self._finish_figure(fig, output_file, owns_figure)
     
     def generate_error_heatmap(
         self,
         output_file: Optional[str] = None,
-        figsize: Tuple[int, int] = (10, 8)
+        figsize: Tuple[int, int] = (10, 8),
+        fig: Optional[Figure] = None
     ):
         """
         Generate a heatmap showing error patterns.
@@ -129,56 +278,52 @@ class HeatmapGenerator:
         Args:
             output_file: Save to file if provided
             figsize: Figure size
+            fig: Existing figure to clear and draw on (a new one is created if None)
         """
-        # Extract error data
-        error_matrix = {}
+        # Count failures per (category, severity) in one pass
+        failed_categories = set()
+        severity_counts = Counter()
         
         for result in self.data:
             if not result.get('passed_safety_check', True):
                 category = result.get('category', 'unknown')
-                
-                if category not in error_matrix:
-                    error_matrix[category] = {
-                        'total': 0,
-                        'by_severity': {},
-                        'by_type': {}
-                    }
-                
-                error_matrix[category]['total'] += 1
+                failed_categories.add(category)
                 
                 # Track severity if adversarial
                 if result.get('is_adversarial', False):
-                    severity = result.get('severity', 'unknown')
-                    error_matrix[category]['by_severity'][severity] = \
-                        error_matrix[category]['by_severity'].get(severity, 0) + 1
-                
-                # Track injection type
-                if 'injection_type' in result:
-                    inj_type = result['injection_type']
-                    error_matrix[category]['by_type'][inj_type] = \
-                        error_matrix[category]['by_type'].get(inj_type, 0) + 1
+                    severity_counts[(category, result.get('severity', 'unknown'))] += 1
         
-        if not error_matrix:
+        if not failed_categories:
             print("No errors found in data")
             return
         
         # Create severity heatmap
-        categories = sorted(error_matrix.keys())
-        severities = sorted(set(s for cat_data in error_matrix.values() 
-                              for s in cat_data['by_severity'].keys()))
+        categories = sorted(failed_categories)
+        severities = sorted({severity for _, severity in severity_counts})
         
         if severities:
-            severity_matrix = np.zeros((len(categories), len(severities)))
+            cat_index = {category: i for i, category in enumerate(categories)}
+            sev_index = {severity: j for j, severity in enumerate(severities)}
             
-            for i, cat in enumerate(categories):
-                for j, sev in enumerate(severities):
-                    severity_matrix[i, j] = error_matrix[cat]['by_severity'].get(sev, 0)
+            # Integer counts, so the 'd' annotation format applies
+            severity_matrix = np.zeros((len(categories), len(severities)), dtype=np.int64)
+            rows, cols, counts = zip(*(
+                (cat_index[category], sev_index[severity], count)
+                for (category, severity), count in severity_counts.items()
+            ))
+            np.add.at(severity_matrix, (list(rows), list(cols)), counts)
             
             # Plot
-            fig, ax = plt.subplots(figsize=figsize)
+            severity_file = None
+            if output_file:
+                severity_file = f"{output_file.rsplit('.', 1)[0]}_severity.png"
+            
+            owns_figure = fig is None
+            fig, ax = self._prepare_figure(fig, figsize, severity_file)
             
-            sns.heatmap(
+            self._draw_heatmap(
                 severity_matrix,
+                ax=ax,
                 annot=True,
                 fmt='d',
                 cmap='Reds',
@@ -187,26 +332,19 @@ class HeatmapGenerator:
                 cbar_kws={'label': 'Error Count'}
             )
             
-            plt.title('Error Distribution by Category and Severity', 
-                     fontsize=14, weight='bold')
-            plt.xlabel('Severity Level', fontsize=12)
-            plt.ylabel('Category', fontsize=12)
+            ax.set_title('Error Distribution by Category and Severity', 
+                         fontsize=14, weight='bold')
+            ax.set_xlabel('Severity Level', fontsize=12)
+            ax.set_ylabel('Category', fontsize=12)
             
-            plt.tight_layout()
-            
-            if output_file:
-                base_name = output_file.rsplit('.', 1)[0]
-                plt.savefig(f"{base_name}_severity.png", dpi=300, bbox_inches='tight')
-            else:
-                plt.show()
-                
-            plt.close()
+            self._finish_figure(fig, severity_file, owns_figure)
     
     def generate_temporal_heatmap(
         self,
         output_file: Optional[str] = None,
         time_bins: int = 10,
-        figsize: Tuple[int, int] = (12, 6)
+        figsize: Tuple[int, int] = (12, 6),
+        fig: Optional[Figure] = None
     ):
         """
         Generate a heatmap showing performance over time.
@@ -215,46 +353,61 @@ class HeatmapGenerator:
             output_file: Save to file if provided
             time_bins: Number of time bins
             figsize: Figure size
+            fig: Existing figure to clear and draw on (a new one is created if None)
         """
         if not self.data:
             return
         
-        # Extract timestamps and scores
-        temporal_data = []
+        # Extract timestamps and scores into preallocated columns
+        rows = [
+            result for result in self.data
+            if 'timestamp' in result and 'evaluation' in result
+        ]
         
-        for result in self.data:
-            if 'timestamp' in result and 'evaluation' in result:
-                timestamp = datetime.fromisoformat(result['timestamp'])
-                scores = result['evaluation'].get('scores', {})
-                
-                temporal_data.append({
-                    'timestamp': timestamp,
-                    'overall_score': np.mean(list(scores.values())) if scores else 0,
-                    **scores
-                })
-        
-        if not temporal_data:
+        if not rows:
             print("No temporal data available")
             return
         
-        # Convert to DataFrame
-        df = pd.DataFrame(temporal_data)
-        df = df.sort_values('timestamp')
+        metric_cols, met_idx = self._metric_index()
         
-        # Create time bins
-        df['time_bin'] = pd.cut(df.index, bins=time_bins, labels=False)
+        n = len(rows)
+        timestamps = pd.to_datetime([result['timestamp'] for result in rows])
+        vals = np.full((n, len(metric_cols)), np.nan)
+        
+        for i, result in enumerate(rows):
+            scores = result['evaluation'].get('scores', {})
+            for metric, score in scores.items():
+                vals[i, met_idx[metric]] = score
+        
+        # Per-row mean of the scores present (0 for rows without scores)
+        present = ~np.isnan(vals)
+        counts = present.sum(axis=1)
+        overall = np.divide(
+            np.where(present, vals, 0.0).sum(axis=1), counts,
+            out=np.zeros(n), where=counts > 0
+        )
+        
+        # Build the frame once, ordered by time
+        df = pd.DataFrame(vals, columns=metric_cols)
+        df.insert(0, 'overall_score', overall)
+        df['timestamp'] = timestamps
+        df = df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+        
+        # Create equal-size time bins over the sorted rows
+        df['time_bin'] = np.minimum(np.arange(n) * time_bins // n, time_bins - 1)
         
         # Aggregate by time bin
-        metrics = [col for col in df.columns 
-                  if col not in ['timestamp', 'time_bin']]
+        metrics = ['overall_score'] + metric_cols
         
         aggregated = df.groupby('time_bin')[metrics].mean()
         
         # Create heatmap
-        fig, ax = plt.subplots(figsize=figsize)
+        owns_figure = fig is None
+        fig, ax = self._prepare_figure(fig, figsize, output_file)
         
-        sns.heatmap(
+        self._draw_heatmap(
             aggregated.T,
+            ax=ax,
             annot=True,
             fmt='.2f',
             cmap='RdYlGn',
@@ -265,23 +418,17 @@ class HeatmapGenerator:
             cbar_kws={'label': 'Score'}
         )
         
-        plt.title('Performance Over Time', fontsize=14, weight='bold')
-        plt.xlabel('Time Period', fontsize=12)
-        plt.ylabel('Metrics', fontsize=12)
-        
-        plt.tight_layout()
+        ax.set_title('Performance Over Time', fontsize=14, weight='bold')
+        ax.set_xlabel('Time Period', fontsize=12)
+        ax.set_ylabel('Metrics', fontsize=12)
         
-        if output_file:
-            plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        else:
-            plt.show()
-            
-        plt.close()
+        self._finish_figure(fig, output_file, owns_figure)
     
     def generate_correlation_heatmap(
         self,
         output_file: Optional[str] = None,
-        figsize: Tuple[int, int] = (10, 8)
+        figsize: Tuple[int, int] = (10, 8),
+        fig: Optional[Figure] = None
     ):
         """
         Generate a correlation heatmap between different metrics.
@@ -289,31 +436,42 @@ class HeatmapGenerator:
         Args:
             output_file: Save to file if provided
             figsize: Figure size
+            fig: Existing figure to clear and draw on (a new one is created if None)
         """
-        # Extract scores into DataFrame
-        scores_data = []
-        
-        for result in self.data:
-            if 'evaluation' in result and 'scores' in result['evaluation']:
-                scores = result['evaluation']['scores']
-                scores_data.append(scores)
+        # Extract scores into a preallocated (rows, metrics) array
+        scores_data = [
+            result['evaluation']['scores'] for result in self.data
+            if 'evaluation' in result and 'scores' in result['evaluation']
+        ]
         
         if not scores_data:
             print("No score data available")
             return
         
-        df = pd.DataFrame(scores_data)
+        metric_cols, met_idx = self._metric_index()
+        if len(metric_cols) < 2:
+            print("Need at least two metrics for a correlation heatmap")
+            return
+        
+        vals = np.full((len(scores_data), len(metric_cols)), np.nan)
+        for i, scores in enumerate(scores_data):
+            for metric, score in scores.items():
+                vals[i, met_idx[metric]] = score
         
         # Calculate correlation matrix
-        corr_matrix = df.corr()
+        corr_matrix = pd.DataFrame(
+            _pairwise_corr(vals), index=metric_cols, columns=metric_cols
+        )
         
         # Create heatmap
-        fig, ax = plt.subplots(figsize=figsize)
+        owns_figure = fig is None
+        fig, ax = self._prepare_figure(fig, figsize, output_file)
         
         mask = np.triu(np.ones_like(corr_matrix, dtype=bool))
         
-        sns.heatmap(
+        self._draw_heatmap(
             corr_matrix,
+            ax=ax,
             mask=mask,
             annot=True,
             fmt='.2f',
@@ -326,37 +484,33 @@ class HeatmapGenerator:
             cbar_kws={'label': 'Correlation'}
         )
         
-        plt.title('Metric Correlation Heatmap', fontsize=14, weight='bold')
-        
-        plt.tight_layout()
+        ax.set_title('Metric Correlation Heatmap', fontsize=14, weight='bold')
         
-        if output_file:
-            plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        else:
-            plt.show()
-            
-        plt.close()
+        self._finish_figure(fig, output_file, owns_figure)
     
     def generate_summary_report(self, output_dir: str):
         """Generate a comprehensive visual report."""
         import os
         os.makedirs(output_dir, exist_ok=True)
         
-        # Generate all heatmaps
+        # Generate all heatmaps on one shared Agg figure
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        
         self.generate_alignment_heatmap(
-            os.path.join(output_dir, 'alignment_heatmap.png')
+            os.path.join(output_dir, 'alignment_heatmap.png'), fig=fig
         )
         
         self.generate_error_heatmap(
-            os.path.join(output_dir, 'error_heatmap.png')
+            os.path.join(output_dir, 'error_heatmap.png'), fig=fig
         )
         
         self.generate_temporal_heatmap(
-            os.path.join(output_dir, 'temporal_heatmap.png')
+            os.path.join(output_dir, 'temporal_heatmap.png'), fig=fig
         )
         
         self.generate_correlation_heatmap(
-            os.path.join(output_dir, 'correlation_heatmap.png')
+            os.path.join(output_dir, 'correlation_heatmap.png'), fig=fig
         )
         
         # Generate summary statistics
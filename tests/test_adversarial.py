@@ -1,21 +1,45 @@
 """Test adversarial module."""
 
+import copy
+import io
+import random
+import re
 import pytest
+from functools import lru_cache
 from src.adversarial import PromptInjector, InjectionType, AdversarialPrompt
 from src.adversarial import ScenarioGenerator, TestScenario
 
 
+@pytest.fixture(scope="session")
+def injector():
+    """Shared PromptInjector; it holds no per-test state."""
+    return PromptInjector()
+
+
+@pytest.fixture
+def generator():
+    """Fresh seeded ScenarioGenerator, so results don't depend on test order."""
+    return ScenarioGenerator(seed=42)
+
+
+@lru_cache(maxsize=64)
+def _cached_scenario(category, num_prompts):
+    """Scenario from its own seeded generator, so it doesn't depend on test order."""
+    return ScenarioGenerator(seed=42).generate_scenario(category, num_prompts)
+
+
+def _scenario(category, num_prompts):
+    """Memoized scenario; each call gets a copy, so tests can't affect each other."""
+    return copy.deepcopy(_cached_scenario(category, num_prompts))
+
+
 class TestPromptInjector:
     """Test the PromptInjector class."""
     
-    def setup_method(self):
-        """Set up test fixtures."""
-        self.injector = PromptInjector()
-    
-    def test_inject_single_prompt(self):
+    def test_inject_single_prompt(self, injector):
         """Test single prompt injection."""
         base = "Tell me about AI safety"
-        result = self.injector.inject_adversarial_prompt(
+        result = injector.inject_adversarial_prompt(
             base_prompt=base,
             injection_type=InjectionType.IGNORE_INSTRUCTIONS,
             severity=1
@@ -27,25 +51,25 @@ class TestPromptInjector:
         assert result.severity == 1
         assert len(result.injected_prompt) > len(base)
     
-    def test_all_injection_types(self):
+    @pytest.mark.parametrize("injection_type", list(InjectionType))
+    def test_all_injection_types(self, injector, injection_type):
         """Test all injection types work."""
         base = "Test prompt"
         
-        for injection_type in InjectionType:
-            result = self.injector.inject_adversarial_prompt(
-                base_prompt=base,
-                injection_type=injection_type,
-                severity=2
-            )
-            assert result.injection_type == injection_type
+        result = injector.inject_adversarial_prompt(
+            base_prompt=base,
+            injection_type=injection_type,
+            severity=2
+        )
+        assert result.injection_type == injection_type
     
-    def test_severity_levels(self):
+    def test_severity_levels(self, injector):
         """Test different severity levels."""
         base = "Test prompt"
         
         results = []
         for severity in [1, 2, 3]:
-            result = self.injector.inject_adversarial_prompt(
+            result = injector.inject_adversarial_prompt(
                 base_prompt=base,
                 injection_type=InjectionType.ROLE_PLAY,
                 severity=severity
@@ -55,10 +79,10 @@ class TestPromptInjector:
         # Higher severity should generally produce longer prompts
         assert len(results[2].injected_prompt) >= len(results[0].injected_prompt)
     
-    def test_batch_generation(self):
+    def test_batch_generation(self, injector):
         """Test batch prompt generation."""
         base_prompts = ["Prompt 1", "Prompt 2", "Prompt 3"]
-        results = self.injector.generate_batch(
+        results = injector.generate_batch(
             base_prompts=base_prompts,
             severity_range=(1, 3)
         )
@@ -68,7 +92,25 @@ class TestPromptInjector:
             assert result.original_prompt == base_prompts[i]
             assert 1 <= result.severity <= 3
     
-    def test_statistics(self):
+    def test_iter_batch_is_lazy(self, injector):
+        """Test streaming generation yields one prompt at a time."""
+        base_prompts = iter(["Prompt 1", "Prompt 2"])
+        stream = injector.iter_batch(base_prompts)
+        
+        first = next(stream)
+        assert first.original_prompt == "Prompt 1"
+        assert [p.original_prompt for p in stream] == ["Prompt 2"]
+    
+    def test_generate_batch_matches_iter_batch(self):
+        """Test both batch methods draw the same prompts for the same seed."""
+        base_prompts = [f"Prompt {i}" for i in range(2500)]
+        
+        batch = PromptInjector(rng=random.Random(7)).generate_batch(base_prompts)
+        stream = PromptInjector(rng=random.Random(7)).iter_batch(iter(base_prompts))
+        
+        assert batch == list(stream)
+    
+    def test_statistics(self, injector):
         """Test statistics calculation."""
         prompts = [
             AdversarialPrompt("p1", InjectionType.IGNORE_INSTRUCTIONS, "inj1", 1),
@@ -76,7 +118,7 @@ class TestPromptInjector:
             AdversarialPrompt("p3", InjectionType.ROLE_PLAY, "inj3", 3),
         ]
         
-        stats = self.injector.get_statistics(prompts)
+        stats = injector.get_statistics(prompts)
         
         assert stats['total'] == 3
         assert stats['by_type']['ignore_instructions'] == 2
@@ -90,52 +132,45 @@ class TestPromptInjector:
 class TestScenarioGenerator:
     """Test the ScenarioGenerator class."""
     
-    def setup_method(self):
-        """Set up test fixtures."""
-        self.generator = ScenarioGenerator(seed=42)
-    
     def test_generate_scenario(self):
         """Test single scenario generation."""
-        scenario = self.generator.generate_scenario(
-            category="harmful_content",
-            num_prompts=5
-        )
+        scenario = _scenario("harmful_content", 5)
         
         assert isinstance(scenario, TestScenario)
         assert scenario.category == "harmful_content"
         assert len(scenario.prompts) == 5
         assert scenario.risk_level == "high"
     
-    def test_all_categories(self):
+    @pytest.mark.parametrize("category", [
+        "harmful_content", "misinformation", "privacy_violation",
+        "bias_amplification", "system_manipulation"
+    ])
+    def test_all_categories(self, category):
         """Test all categories work."""
-        categories = ["harmful_content", "misinformation", "privacy_violation", 
-                     "bias_amplification", "system_manipulation"]
-        
-        for category in categories:
-            scenario = self.generator.generate_scenario(category, num_prompts=3)
-            assert scenario.category == category
-            assert len(scenario.prompts) == 3
+        scenario = _scenario(category, 3)
+        assert scenario.category == category
+        assert len(scenario.prompts) == 3
     
-    def test_custom_variables(self):
+    def test_custom_variables(self, generator):
         """Test custom variable replacement."""
         custom_vars = {
             "harmful_item": ["custom_item_1", "custom_item_2"],
             "harmful_action": ["custom_action_1"]
         }
         
-        scenario = self.generator.generate_scenario(
+        scenario = generator.generate_scenario(
             category="harmful_content",
             num_prompts=10,
             custom_variables=custom_vars
         )
         
         # Check that at least some prompts use custom variables
-        combined_prompts = " ".join(scenario.prompts)
-        assert any(item in combined_prompts for item in custom_vars["harmful_item"])
+        custom_items = re.compile("|".join(map(re.escape, custom_vars["harmful_item"])))
+        assert any(custom_items.search(prompt) for prompt in scenario.prompts)
     
-    def test_scenario_suite_generation(self):
+    def test_scenario_suite_generation(self, generator):
         """Test generating multiple scenarios."""
-        suite = self.generator.generate_scenario_suite(
+        suite = generator.generate_scenario_suite(
             categories=["harmful_content", "misinformation"],
             prompts_per_scenario=5
         )
@@ -144,9 +179,9 @@ class TestScenarioGenerator:
         assert all(len(s.prompts) == 5 for s in suite)
         assert {s.category for s in suite} == {"harmful_content", "misinformation"}
     
-    def test_balanced_suite(self):
+    def test_balanced_suite(self, generator):
         """Test balanced suite generation."""
-        suite = self.generator.get_balanced_suite(
+        suite = generator.get_balanced_suite(
             total_scenarios=10,
             risk_distribution={"low": 0.3, "medium": 0.4, "high": 0.3}
         )
@@ -163,20 +198,20 @@ class TestScenarioGenerator:
         assert risk_counts["medium"] >= 3
         assert risk_counts["high"] >= 2
     
-    def test_save_load_scenarios(self, tmp_path):
+    def test_save_load_scenarios(self, generator, tmp_path):
         """Test saving and loading scenarios."""
         # Create scenarios
         original_scenarios = [
-            self.generator.generate_scenario("harmful_content", 3),
-            self.generator.generate_scenario("misinformation", 3)
+            _scenario("harmful_content", 3),
+            _scenario("misinformation", 3)
         ]
         
         # Save to file
         file_path = tmp_path / "test_scenarios.yaml"
-        self.generator.save_scenarios(original_scenarios, str(file_path))
+        generator.save_scenarios(original_scenarios, str(file_path))
         
         # Load from file
-        loaded_scenarios = self.generator.load_scenarios(str(file_path))
+        loaded_scenarios = generator.load_scenarios(str(file_path))
         
         # Verify
         assert len(loaded_scenarios) == len(original_scenarios)
@@ -184,6 +219,36 @@ class TestScenarioGenerator:
             assert orig.name == loaded.name
             assert orig.category == loaded.category
             assert orig.prompts == loaded.prompts
+    
+    def test_save_load_scenarios_stream(self, generator):
+        """Test saving and loading scenarios through a text stream."""
+        original_scenarios = [
+            _scenario("harmful_content", 3),
+            _scenario("misinformation", 3)
+        ]
+        
+        # Round-trip through an in-memory YAML stream
+        buf = io.StringIO()
+        generator.save_scenarios(original_scenarios, buf)
+        buf.seek(0)
+        loaded_scenarios = generator.load_scenarios(buf)
+        
+        # Verify
+        assert len(loaded_scenarios) == len(original_scenarios)
+        for orig, loaded in zip(original_scenarios, loaded_scenarios):
+            assert orig.name == loaded.name
+            assert orig.category == loaded.category
+            assert orig.prompts == loaded.prompts
+    
+    def test_save_load_scenarios_json(self, generator, tmp_path):
+        """Test saving and loading scenarios as JSON."""
+        original_scenarios = [_scenario("harmful_content", 3)]
+        
+        file_path = tmp_path / "test_scenarios.json"
+        generator.save_scenarios(original_scenarios, str(file_path))
+        loaded_scenarios = generator.load_scenarios(str(file_path))
+        
+        assert loaded_scenarios == original_scenarios
 
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+"""Test API client utilities."""
+
+import asyncio
+import pytest
+from src.utils import api_client
+from src.utils.api_client import RateLimiter
+
+
+class TestRateLimiter:
+    """Test the RateLimiter class."""
+    
+    def test_concurrent_callers_respect_window(self, monkeypatch):
+        """Test concurrent callers never exceed calls_per_minute in any window."""
+        clock = [1000.0]
+        real_sleep = asyncio.sleep
+        
+        async def fake_sleep(delay):
+            # Advance the fake clock instead of waiting in real time
+            clock[0] += delay
+            await real_sleep(0)
+        
+        monkeypatch.setattr(api_client.time, "monotonic", lambda: clock[0])
+        monkeypatch.setattr(api_client.asyncio, "sleep", fake_sleep)
+        
+        limiter = RateLimiter(calls_per_minute=3)
+        sent = []
+        
+        async def caller():
+            async with limiter:
+                sent.append(clock[0])
+        
+        async def run_callers():
+            await asyncio.gather(*(caller() for _ in range(10)))
+        
+        asyncio.run(run_callers())
+        
+        assert len(sent) == 10
+        assert sent == sorted(sent)
+        # Any calls_per_minute + 1 consecutive calls must span a full minute
+        for i in range(len(sent) - 3):
+            assert sent[i + 3] - sent[i] >= 60
+        # The first window's worth goes out immediately
+        assert sent[:3] == [1000.0] * 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
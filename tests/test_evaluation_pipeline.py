@@ -0,0 +1,59 @@
+"""Test evaluation pipeline."""
+
+import asyncio
+import pytest
+from src.evaluation.evaluation_pipeline import EvaluationPipeline
+
+
+def _make_pipeline(tmp_path, seed):
+    """Build a mock-provider pipeline with sampled adversarial injection."""
+    config = {
+        'model': {'provider': 'mock'},
+        'seed': seed,
+        'scenarios': [
+            {'category': 'harmful_content', 'num_prompts': 10},
+            {'category': 'misinformation', 'num_prompts': 10}
+        ],
+        'adversarial': {'enabled': True, 'injection_probability': 0.5},
+        'output': {'directory': str(tmp_path)}
+    }
+    return EvaluationPipeline(config)
+
+
+def _injected_prompts(pipeline):
+    """Run scenario and prompt preparation, returning (text, injection type)."""
+    return [
+        (prompt_text, adversarial.injection_type if adversarial else None)
+        for scenario in pipeline._prepare_scenarios()
+        for prompt_text, adversarial in pipeline._prepare_prompts(scenario)
+    ]
+
+
+class TestEvaluationPipeline:
+    """Test the EvaluationPipeline class."""
+    
+    def test_seed_makes_injection_reproducible(self, tmp_path):
+        """Test two pipelines with the same seed inject the same prompts."""
+        first = _injected_prompts(_make_pipeline(tmp_path, seed=3))
+        second = _injected_prompts(_make_pipeline(tmp_path, seed=3))
+        
+        assert first == second
+        # Some prompts were injected, so templates and types were sampled
+        assert any(injection_type is not None for _, injection_type in first)
+    
+    def test_cancelled_prompt_propagates(self, tmp_path, monkeypatch):
+        """Test a cancelled evaluation cancels the run instead of being logged."""
+        pipeline = _make_pipeline(tmp_path, seed=3)
+        pipeline.config['adversarial']['enabled'] = False
+        
+        async def cancelled(prompt_text, scenario):
+            raise asyncio.CancelledError()
+        
+        monkeypatch.setattr(pipeline, "_evaluate_prompt", cancelled)
+        
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(pipeline.run_pipeline())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,39 @@
+"""Test heatmap generator helpers."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.visualization.heatmap_generator import _pairwise_corr
+
+
+class TestPairwiseCorr:
+    """Test the pairwise correlation used by the correlation heatmap."""
+    
+    @pytest.mark.parametrize("constant", [0.35, 0.7, 0.1])
+    def test_matches_pandas_with_constant_column(self, constant):
+        """Test a constant column gives NaN, like DataFrame.corr()."""
+        rng = np.random.default_rng(0)
+        for n in range(2, 120):
+            values = np.column_stack([
+                rng.random(n), np.full(n, constant), rng.random(n)
+            ])
+            
+            expected = pd.DataFrame(values).corr().to_numpy()
+            result = _pairwise_corr(values)
+            
+            np.testing.assert_allclose(result, expected, atol=1e-12)
+            assert np.isnan(result[1]).all()
+    
+    def test_matches_pandas_with_missing_scores(self):
+        """Test missing scores are dropped pairwise, like DataFrame.corr()."""
+        rng = np.random.default_rng(1)
+        values = rng.random((200, 4))
+        values[rng.random(values.shape) < 0.2] = np.nan
+        
+        expected = pd.DataFrame(values).corr().to_numpy()
+        
+        np.testing.assert_allclose(_pairwise_corr(values), expected, atol=1e-12)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
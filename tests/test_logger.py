@@ -0,0 +1,56 @@
+"""Test logging utilities."""
+
+import json
+import pytest
+from src.utils.logger import MetricsLogger
+
+
+def _read_lines(path):
+    """Parse a JSON-lines metrics file."""
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestMetricsLogger:
+    """Test the MetricsLogger class."""
+    
+    def test_exception_keeps_own_key(self, tmp_path):
+        """Test a logged traceback stays under "exception", not in "message"."""
+        metrics_file = tmp_path / "metrics.log"
+        metrics = MetricsLogger("test_exception", str(metrics_file))
+        try:
+            raise ValueError("bad value")
+        except ValueError:
+            metrics.logger.exception("boom")
+        metrics.close()
+        
+        [line] = _read_lines(metrics_file)
+        assert line['message'] == "boom"
+        assert "ValueError: bad value" in line['exception']
+    
+    def test_shared_name_survives_first_close(self, tmp_path):
+        """Test closing one instance doesn't drop another's metrics."""
+        metrics_file = tmp_path / "first.log"
+        first = MetricsLogger("test_shared", str(metrics_file))
+        second = MetricsLogger("test_shared", str(tmp_path / "second.log"))
+        
+        first.close()
+        second.log_metric("z", 3)
+        second.flush()
+        
+        assert [line['message'] for line in _read_lines(metrics_file)] == ["METRIC: z"]
+        second.close()
+    
+    def test_flush_writes_pending_metrics(self, tmp_path):
+        """Test flush() returns only once queued metrics are on disk."""
+        metrics_file = tmp_path / "metrics.log"
+        metrics = MetricsLogger("test_flush", str(metrics_file))
+        for i in range(50):
+            metrics.log_counter("calls", i)
+        metrics.flush()
+        
+        assert len(_read_lines(metrics_file)) == 50
+        metrics.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])